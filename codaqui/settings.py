@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # Third party apps
     "social_django",
     # Local apps
@@ -115,6 +116,27 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# The cache must be shared by every worker so an invalidation (e.g. of the
+# CodaPoints leaderboard and ranks) reaches all of them. "db" keeps it in the
+# table created by `python manage.py createcachetable`; "locmem" is per
+# process and only suits a single development server.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "db")
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+            # Room for one cached rank per active student.
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+        if CACHE_BACKEND == "db"
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -162,6 +184,14 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 GH_PRIVATE_KEY_FILE = os.getenv("GH_PRIVATE_KEY_FILE")
 GH_APP_INSTALL_ID = os.getenv("GH_APP_INSTALL_ID")
 GH_APP_ID = os.getenv("GH_APP_ID")
+GH_WEBHOOK_SECRET = os.getenv("GH_WEBHOOK_SECRET")
+
+# CodaPoints given for GitHub contributions received by the webhook: issues
+# closed as completed (to the assignees), pull requests merged (to the
+# author) and reviews submitted (to the reviewer). 0 disables a rule.
+CODAPOINTS_ISSUE_CLOSED = os.getenv("CODAPOINTS_ISSUE_CLOSED", "10")
+CODAPOINTS_PULL_REQUEST_MERGED = os.getenv("CODAPOINTS_PULL_REQUEST_MERGED", "20")
+CODAPOINTS_REVIEW_SUBMITTED = os.getenv("CODAPOINTS_REVIEW_SUBMITTED", "5")
 
 # Discord Bot Integration
 # https://discord.com/developers/docs/reference
@@ -205,6 +235,63 @@ if not GITHUB_ORGANIZATION:
     )
 GITHUB_REPOSITORY = os.getenv("GITHUB_REPOSITORY", "tutor")
 
+# Repositories shown on the issue board: a comma separated list of names,
+# every repository with a topic, or every repository of a team. Defaults to
+# GITHUB_REPOSITORY alone.
+GITHUB_BOARD_REPOSITORIES = [
+    name.strip()
+    for name in os.getenv("GITHUB_BOARD_REPOSITORIES", "").split(",")
+    if name.strip()
+]
+GITHUB_BOARD_TOPIC = os.getenv("GITHUB_BOARD_TOPIC", "")
+GITHUB_BOARD_TEAM = os.getenv("GITHUB_BOARD_TEAM", "")
+
+# Conditional-request (ETag) cache for GitHub API reads
+GITHUB_CACHE_MAX_ENTRIES = int(os.getenv("GITHUB_CACHE_MAX_ENTRIES", 512))
+GITHUB_CACHE_MAX_AGE = int(os.getenv("GITHUB_CACHE_MAX_AGE", 3600))
+
+# Concurrent page requests when walking paginated GitHub lists
+GITHUB_PAGINATION_WORKERS = int(os.getenv("GITHUB_PAGINATION_WORKERS", 4))
+
+# Threads running GitHub calls for the async views, which is also the size of
+# the pooled HTTP connections to api.github.com
+GITHUB_ASYNC_WORKERS = int(os.getenv("GITHUB_ASYNC_WORKERS", 16))
+
+# Concurrent GitHub Team invites sent by the student admin actions
+GITHUB_INVITE_WORKERS = int(os.getenv("GITHUB_INVITE_WORKERS", 8))
+
+# Comments fetched per GraphQL issue query
+GITHUB_GRAPHQL_COMMENTS = int(os.getenv("GITHUB_GRAPHQL_COMMENTS", 50))
+
+# Rendered Markdown bodies kept in memory and words shown in issue previews
+GITHUB_RENDER_CACHE_ENTRIES = int(os.getenv("GITHUB_RENDER_CACHE_ENTRIES", 2048))
+GITHUB_PREVIEW_WORDS = int(os.getenv("GITHUB_PREVIEW_WORDS", 50))
+
+# GitHub rate limit handling: remaining/limit ratio below which background
+# calls are slowed down, longest a request may wait for the budget and how
+# many times rate limited requests are retried.
+GITHUB_RATE_LIMIT_SLOWDOWN = float(os.getenv("GITHUB_RATE_LIMIT_SLOWDOWN", 0.2))
+GITHUB_RATE_LIMIT_MAX_WAIT = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", 10))
+GITHUB_RATE_LIMIT_RETRIES = int(os.getenv("GITHUB_RATE_LIMIT_RETRIES", 3))
+
+# Activities per page on the wallet history
+WALLET_HISTORY_PAGE_SIZE = int(os.getenv("WALLET_HISTORY_PAGE_SIZE", 50))
+
+# Users compared per query by the ledger reconciliation
+WALLET_RECONCILE_CHUNK_SIZE = int(os.getenv("WALLET_RECONCILE_CHUNK_SIZE", 2000))
+
+# Rows read from the database at a time by the activity exports
+WALLET_EXPORT_CHUNK_SIZE = int(os.getenv("WALLET_EXPORT_CHUNK_SIZE", 2000))
+
+# Automatic CodaPoints awards are queued and posted in one transaction
+# every few seconds, or as soon as this many are waiting
+WALLET_AWARD_FLUSH_INTERVAL = float(os.getenv("WALLET_AWARD_FLUSH_INTERVAL", 5))
+WALLET_AWARD_BATCH_SIZE = int(os.getenv("WALLET_AWARD_BATCH_SIZE", 500))
+
+# Students shown on the CodaPoints leaderboard and seconds it stays cached
+WALLET_LEADERBOARD_SIZE = int(os.getenv("WALLET_LEADERBOARD_SIZE", 20))
+WALLET_LEADERBOARD_TIMEOUT = int(os.getenv("WALLET_LEADERBOARD_TIMEOUT", 300))
+
 
 # Custom User Model with OAuth
 # https://python-social-auth.readthedocs.io/en/latest/configuration/django.html
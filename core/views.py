@@ -2,6 +2,7 @@ from django.contrib.auth import logout
 from django.shortcuts import redirect, render
 
 from users.models import User
+from wallet.leaderboard import user_rank
 
 # Create your views here.
 
@@ -16,6 +17,7 @@ def index_view(request):
             data["student"] = request.user.student
             if not data["student"].is_active:
                 return render(request, "core/index.html", data)
+            data["rank"] = user_rank(request.user)
         except User.student.RelatedObjectDoesNotExist:
             return redirect("student:student_form")
     else:
@@ -0,0 +1,169 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404
+
+from codaqui.settings import GITHUB_ASYNC_WORKERS
+from github_service.board import (
+    IssueBoard,
+    fetch_open_issues,
+    merge_board,
+    mirrored_open_issues,
+    record_failure,
+    resolve_board_repositories,
+)
+from github_service.graphql import fetch_all_comments, fetch_issue_thread
+from github_service.models import Issue, RepositorySync
+from github_service.schemas import CommentSummary, IssueSummary, comment_summaries
+from github_service.sync import DEFAULT_REPOSITORY, store_issue_thread
+
+# Blocking GitHub calls of the async views run here, on the pooled
+# `client.session`, so the event loop keeps serving other requests while
+# api.github.com answers. Only network calls go to this pool: database work
+# goes through `sync_to_async`, which keeps Django's connection handling.
+executor = ThreadPoolExecutor(
+    max_workers=GITHUB_ASYNC_WORKERS, thread_name_prefix="github-api"
+)
+
+
+async def run(function, *args, **kwargs):
+    """
+    Awaits a blocking GitHub call that does not touch the database.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(function, *args, **kwargs)
+    )
+
+
+def alogin_required(view):
+    """
+    ``login_required`` for async views. Django's async variant relies on
+    ``request.auser()``, which needs every authentication backend to
+    implement ``aget_user``; the social-auth GitHub backend does not. The
+    user is resolved through the synchronous path instead, leaving
+    ``request.user`` loaded for the view.
+    """
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if await sync_to_async(lambda: request.user.is_authenticated)():
+            return await view(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path())
+
+    return wrapper
+
+
+async def ais_mirrored(repository: str = DEFAULT_REPOSITORY) -> bool:
+    """
+    Whether the repository was fully synced and can be read from the database.
+    """
+    return await RepositorySync.objects.filter(repository=repository).aexists()
+
+
+async def aload_board() -> IssueBoard:
+    """
+    Loads the open issues of every board repository into a single stream.
+
+    Mirrored repositories are read with one database query while the others
+    are fetched from GitHub at the same time. A repository that fails to
+    load is reported in ``failures`` and left out, without affecting the
+    others.
+    """
+    repositories, failures = await run(resolve_board_repositories)
+    mirrored = {
+        repository
+        async for repository in RepositorySync.objects.filter(
+            repository__in=repositories
+        ).values_list("repository", flat=True)
+    }
+    live = [repository for repository in repositories if repository not in mirrored]
+
+    mirrored_issues, results = await asyncio.gather(
+        sync_to_async(mirrored_open_issues)(mirrored),
+        asyncio.gather(
+            *(run(fetch_open_issues, repository) for repository in live),
+            return_exceptions=True,
+        ),
+    )
+    sources = [mirrored_issues]
+    for repository, result in zip(live, results):
+        if isinstance(result, Exception):
+            record_failure(failures, repository, result)
+        else:
+            sources.append(result)
+    return merge_board(repositories, sources, failures)
+
+
+async def aload_issue_thread(issue_number: int, after: str = None):
+    """
+    Fetches an issue and a page of its comments with one GraphQL call. When
+    the repository is mirrored, the issue and all of its comments are stored
+    so the next render is served from the database.
+
+    Args:
+        issue_number (int): The issue number.
+        after (str): Comment cursor from a previous page.
+
+    Returns:
+        tuple: The issue, its comments and the cursor of the next comment
+        page (None on the last page). Summaries are returned instead of
+        saved instances when the repository is not mirrored.
+
+    Raises:
+        Http404: If the number does not belong to an issue.
+    """
+    thread, mirrored = await asyncio.gather(
+        run(fetch_issue_thread, issue_number, after=after), ais_mirrored()
+    )
+    if thread is None:
+        raise Http404(f"Issue #{issue_number} not found")
+
+    if not mirrored:
+        issue = IssueSummary.from_json(thread.issue)
+        comments = [CommentSummary.from_json(data) for data in thread.comments]
+        return issue, comments, thread.next_cursor
+
+    comments = await run(fetch_all_comments, issue_number, thread)
+    if comments is None:
+        raise Http404(f"Issue #{issue_number} not found")
+    issue, comments = await sync_to_async(store_issue_thread)(thread.issue, comments)
+    return issue, comments, None
+
+
+async def _amirrored_issue(issue_number: int) -> Issue | None:
+    if not await ais_mirrored():
+        return None
+    return await Issue.objects.filter(
+        repository=DEFAULT_REPOSITORY, number=issue_number
+    ).afirst()
+
+
+async def aload_issue(issue_number: int):
+    """
+    Loads an issue from the local mirror, falling back to GitHub when the
+    repository is not mirrored or the issue has not been synced yet.
+    """
+    issue = await _amirrored_issue(issue_number)
+    if issue is None:
+        issue, _, _ = await aload_issue_thread(issue_number)
+    return issue
+
+
+async def aload_comments(issue_number: int, after: str = None):
+    """
+    Lists the comments of an issue, from the local mirror when available.
+
+    Returns:
+        tuple: The comments and the cursor of the next page, if any; the
+        cursor is only used when reading from GitHub.
+    """
+    issue = await _amirrored_issue(issue_number)
+    if issue is not None:
+        comments = issue.comments.order_by("created_at")
+        return await sync_to_async(comment_summaries)(comments), None
+    _, comments, next_cursor = await aload_issue_thread(issue_number, after)
+    return comments, next_cursor
@@ -1,11 +1,139 @@
 import logging
+import threading
 import time
+from datetime import datetime
 
 import requests
 from jwt import JWT, jwk_from_pem
 
 from codaqui.settings import GH_APP_ID, GH_APP_INSTALL_ID, GH_PRIVATE_KEY_FILE
 
+# GitHub accepts App JWTs for at most 10 minutes.
+JWT_LIFETIME = 600
+# Refresh credentials this many seconds before they actually expire, so a
+# token handed to a request is never rejected halfway through it.
+JWT_REFRESH_MARGIN = 60
+TOKEN_REFRESH_MARGIN = 300
+
+
+class GitHubAppTokenProvider:
+    """
+    Process-wide cache for the GitHub App credentials.
+
+    The private key is read and parsed once, the App JWT is reused until it is
+    close to its 10 minute expiry and the installation access token is reused
+    until shortly before the ``expires_at`` returned by GitHub. Refreshes are
+    serialized with a lock so concurrent requests mint a single token.
+    """
+
+    def __init__(self, private_key_file=None, app_id=None, install_id=None):
+        self.private_key_file = private_key_file or GH_PRIVATE_KEY_FILE
+        self.app_id = app_id or GH_APP_ID
+        self.install_id = install_id or GH_APP_INSTALL_ID
+        self._lock = threading.Lock()
+        self._signing_key = None
+        self._jwt = None
+        self._jwt_expires_at = 0.0
+        self._token = None
+        self._token_expires_at = 0.0
+        self.stats = {
+            "jwt_hits": 0,
+            "jwt_refreshes": 0,
+            "token_hits": 0,
+            "token_refreshes": 0,
+        }
+
+    def _get_signing_key(self):
+        if self._signing_key is None:
+            with open(self.private_key_file, "rb") as pem_file:
+                self._signing_key = jwk_from_pem(pem_file.read())
+        return self._signing_key
+
+    def _get_jwt(self) -> str:
+        now = time.time()
+        if self._jwt and now < self._jwt_expires_at - JWT_REFRESH_MARGIN:
+            self.stats["jwt_hits"] += 1
+            return self._jwt
+
+        issued_at = int(now)
+        payload = {
+            # Issued at time
+            "iat": issued_at,
+            # JWT expiration time (10 minutes maximum)
+            "exp": issued_at + JWT_LIFETIME,
+            # GitHub App's ID
+            "iss": self.app_id,
+        }
+        self._jwt = JWT().encode(payload, self._get_signing_key(), alg="RS256")
+        self._jwt_expires_at = issued_at + JWT_LIFETIME
+        self.stats["jwt_refreshes"] += 1
+        return self._jwt
+
+    def _request_access_token(self):
+        headers = {
+            "Authorization": f"Bearer {self._get_jwt()}",
+            "Accept": "application/vnd.github.v3+json",
+        }
+        url = (
+            f"https://api.github.com/app/installations/{self.install_id}/access_tokens"
+        )
+        response = requests.post(url, headers=headers)
+
+        if response.status_code != 201:
+            logging.error(response.json())
+            raise Exception("Failed to generate access token")
+
+        data = response.json()
+        expires_at = datetime.fromisoformat(
+            data["expires_at"].replace("Z", "+00:00")
+        ).timestamp()
+        return data["token"], expires_at
+
+    def get_jwt(self) -> str:
+        """
+        Returns a valid JWT for authenticating as the GitHub App.
+        """
+        with self._lock:
+            return self._get_jwt()
+
+    def get_access_token(self) -> str:
+        """
+        Returns a valid installation access token, minting a new one only when
+        the cached token is missing or about to expire.
+        """
+        with self._lock:
+            if (
+                self._token
+                and time.time() < self._token_expires_at - TOKEN_REFRESH_MARGIN
+            ):
+                self.stats["token_hits"] += 1
+                return self._token
+
+            self._token, self._token_expires_at = self._request_access_token()
+            self.stats["token_refreshes"] += 1
+            return self._token
+
+    def invalidate(self, token: str = None) -> bool:
+        """
+        Drops the cached installation token, e.g. after GitHub answered 401.
+
+        Args:
+            token (str): Drop the cache only if it still holds this token, so
+                a token another thread already replaced is kept.
+
+        Returns:
+            bool: Whether a cached token was dropped.
+        """
+        with self._lock:
+            if self._token is None or token not in (None, self._token):
+                return False
+            self._token = None
+            self._token_expires_at = 0.0
+            return True
+
+
+token_provider = GitHubAppTokenProvider()
+
 
 def generate_jwt_from_app():
     """
@@ -14,22 +142,7 @@ def generate_jwt_from_app():
     Returns:
         str: The encoded JWT.
     """
-    with open(GH_PRIVATE_KEY_FILE, "rb") as pem_file:
-        signing_key = jwk_from_pem(pem_file.read())
-
-    payload = {
-        # Issued at time
-        "iat": int(time.time()),
-        # JWT expiration time (10 minutes maximum)
-        "exp": int(time.time()) + 600,
-        # GitHub App's ID
-        "iss": GH_APP_ID,
-    }
-
-    # Create JWT
-    jwt_instance = JWT()
-    encoded_jwt = jwt_instance.encode(payload, signing_key, alg="RS256")
-    return encoded_jwt
+    return token_provider.get_jwt()
 
 
 def generate_access_token():
@@ -39,19 +152,4 @@ def generate_access_token():
     Returns:
         str: The generated access token.
     """
-    jwt = generate_jwt_from_app()
-
-    headers = {
-        "Authorization": f"Bearer {jwt}",
-        "Accept": "application/vnd.github.v3+json",
-    }
-
-    url = f"https://api.github.com/app/installations/{GH_APP_INSTALL_ID}/access_tokens"
-    response = requests.post(url, headers=headers)
-
-    if response.status_code == 201:
-        access_token = response.json().get("token")
-        return access_token
-    else:
-        logging.error(response.json())
-        raise Exception("Failed to generate access token")
+    return token_provider.get_access_token()
@@ -0,0 +1,112 @@
+import heapq
+import logging
+from operator import attrgetter
+from typing import NamedTuple
+
+import requests
+
+from codaqui.settings import (
+    GITHUB_BOARD_REPOSITORIES,
+    GITHUB_BOARD_TEAM,
+    GITHUB_BOARD_TOPIC,
+    GITHUB_ORGANIZATION,
+)
+from github_service.client import get_json, paginate
+from github_service.models import Issue
+from github_service.ratelimit import GitHubRateLimitError
+from github_service.schemas import IssueSummary, issue_summaries, project_issue_page
+from github_service.sync import DEFAULT_REPOSITORY
+
+
+class IssueBoard(NamedTuple):
+    """
+    Open issues of every board repository, most recently updated first.
+    ``failures`` maps the repositories that could not be loaded to the reason.
+    """
+
+    issues: list
+    repositories: list
+    failures: dict
+
+
+def _full_name(name: str) -> str:
+    return name if "/" in name else f"{GITHUB_ORGANIZATION}/{name}"
+
+
+def board_repositories() -> list[str]:
+    """
+    Resolves the repositories shown on the issue board, in order of
+    precedence: ``GITHUB_BOARD_REPOSITORIES``, ``GITHUB_BOARD_TOPIC``,
+    ``GITHUB_BOARD_TEAM`` and finally the default repository.
+
+    Returns:
+        list[str]: Repository full names, e.g. ``codaqui/tutor``.
+    """
+    if GITHUB_BOARD_REPOSITORIES:
+        return [_full_name(name) for name in GITHUB_BOARD_REPOSITORIES]
+    if GITHUB_BOARD_TOPIC:
+        query = f"org:{GITHUB_ORGANIZATION} topic:{GITHUB_BOARD_TOPIC} archived:false"
+        result = get_json(
+            "https://api.github.com/search/repositories",
+            {"q": query, "per_page": 100},
+        )
+        return sorted(repo["full_name"] for repo in result["items"])
+    if GITHUB_BOARD_TEAM:
+        url = f"https://api.github.com/orgs/{GITHUB_ORGANIZATION}/teams/{GITHUB_BOARD_TEAM}/repos"
+        return sorted(
+            repo["full_name"] for repo in paginate(url) if not repo["archived"]
+        )
+    return [DEFAULT_REPOSITORY]
+
+
+def fetch_open_issues(repository: str) -> list[IssueSummary]:
+    """
+    Lists the open issues of a repository straight from GitHub, most
+    recently updated first. Pages are cached already summarized.
+    """
+    url = f"https://api.github.com/repos/{repository}/issues"
+    params = {"state": "open", "sort": "updated", "direction": "desc"}
+    return list(paginate(url, params, project=project_issue_page(repository)))
+
+
+def resolve_board_repositories() -> tuple[list[str], dict]:
+    """
+    :func:`board_repositories`, keeping the default repository on the board
+    while the topic or team cannot be listed.
+
+    Returns:
+        tuple[list[str], dict]: The repositories and the failures so far.
+    """
+    try:
+        return board_repositories(), {}
+    except (requests.RequestException, GitHubRateLimitError, KeyError) as error:
+        logging.error(f"Could not resolve the issue board repositories: {error}")
+        return [DEFAULT_REPOSITORY], {
+            GITHUB_BOARD_TOPIC or GITHUB_BOARD_TEAM: str(error)
+        }
+
+
+def mirrored_open_issues(repositories) -> list[IssueSummary]:
+    """
+    The open issues of mirrored repositories, from a single query.
+    """
+    return issue_summaries(
+        Issue.objects.filter(repository__in=repositories, state="open").order_by(
+            "-updated_at"
+        )
+    )
+
+
+def record_failure(failures: dict, repository: str, error: Exception):
+    # Any failure, including unexpected payloads such as a 404 body, only
+    # takes this repository off the board.
+    logging.error(f"Could not load the issues of {repository}: {error!r}")
+    failures[repository] = str(error)
+
+
+def merge_board(repositories: list, sources: list, failures: dict) -> IssueBoard:
+    """
+    Merges issue lists already sorted by ``updated_at`` without a full sort.
+    """
+    issues = list(heapq.merge(*sources, key=attrgetter("updated_at"), reverse=True))
+    return IssueBoard(issues, repositories, failures)
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class CachedResponse:
+    """
+    A decoded GitHub response together with its validators.
+    """
+
+    data: Any
+    etag: str | None = None
+    last_modified: str | None = None
+    links: dict = field(default_factory=dict)
+    stored_at: float = field(default_factory=time.monotonic)
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a size bound and a maximum entry age.
+
+    Args:
+        max_entries (int): Entries kept before the least recently used is evicted.
+        max_age (float): Seconds an entry lives without being refreshed. ``0``
+            disables the age limit.
+    """
+
+    def __init__(self, max_entries: int = 512, max_age: float = 0):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, entry) -> bool:
+        return bool(self.max_age) and time.monotonic() - entry.stored_at > self.max_age
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry):
+                self._entries.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def touch(self, key):
+        """
+        Marks an entry as fresh again, e.g. after GitHub answered 304.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.stored_at = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    function and every caller arriving before it finishes waits for and
+    shares the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"flights": 0, "hits": 0, "wait_seconds": 0.0}
+
+    def do(self, key, function):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                self.stats["flights"] += 1
+
+        if not leader:
+            started = time.monotonic()
+            try:
+                return call.result()
+            finally:
+                with self._lock:
+                    self.stats["hits"] += 1
+                    self.stats["wait_seconds"] += time.monotonic() - started
+
+        try:
+            result = function()
+        except BaseException as error:
+            call.set_exception(error)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
@@ -0,0 +1,267 @@
+import itertools
+import math
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from codaqui.settings import (
+    GITHUB_ASYNC_WORKERS,
+    GITHUB_CACHE_MAX_AGE,
+    GITHUB_CACHE_MAX_ENTRIES,
+    GITHUB_PAGINATION_WORKERS,
+    GITHUB_RATE_LIMIT_MAX_WAIT,
+    GITHUB_RATE_LIMIT_RETRIES,
+    GITHUB_RATE_LIMIT_SLOWDOWN,
+)
+from github_service.auth import generate_access_token, token_provider
+from github_service.cache import CachedResponse, LRUCache, SingleFlight
+from github_service.ratelimit import RateLimiter
+
+# Largest page size accepted by the GitHub REST API.
+PER_PAGE = 100
+
+# Conditional-request cache for reads made with the App installation token.
+# GitHub does not count 304 answers against the rate limit, so revalidating
+# an unchanged resource is free and skips decoding the body again.
+response_cache = LRUCache(
+    max_entries=GITHUB_CACHE_MAX_ENTRIES, max_age=GITHUB_CACHE_MAX_AGE
+)
+cache_stats = {"revalidated": 0, "fetched": 0}
+
+# Identical reads running at the same moment (e.g. a whole class opening the
+# issue board) share a single GitHub request.
+in_flight = SingleFlight()
+
+# Shared by every GitHub call so connections are kept alive between requests.
+# The pool fits every thread that may call GitHub at once, so connections are
+# reused instead of being discarded when it is full.
+session = requests.Session()
+session.mount(
+    "https://",
+    HTTPAdapter(pool_maxsize=max(GITHUB_ASYNC_WORKERS, GITHUB_PAGINATION_WORKERS)),
+)
+rate_limiter = RateLimiter(
+    slowdown_threshold=GITHUB_RATE_LIMIT_SLOWDOWN,
+    max_wait=GITHUB_RATE_LIMIT_MAX_WAIT,
+)
+
+
+def github_headers():
+    access_token = generate_access_token()
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/vnd.github+json",
+    }
+
+
+def request(
+    method: str, url: str, headers: dict = None, urgent: bool = True, **kwargs
+) -> requests.Response:
+    """
+    Sends a request to the GitHub API through the shared rate limiter.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The API URL.
+        headers (dict): Request headers, defaults to the App installation token.
+        urgent (bool): Whether a user is waiting for the answer. Non-urgent
+            calls (syncs, batch jobs) are slowed down first when the budget
+            runs low.
+        **kwargs: Passed to :meth:`requests.Session.request`.
+
+    Returns:
+        requests.Response: The last response, after retrying rate limited
+        attempts with jittered backoff. A 401 to the cached installation
+        token is retried once with a freshly minted token.
+
+    Raises:
+        GitHubRateLimitError: If the budget will not recover soon enough.
+    """
+    headers = headers if headers is not None else github_headers()
+    response = _send(method, url, headers, urgent, **kwargs)
+    token = headers.get("Authorization", "").removeprefix("Bearer ")
+    if response.status_code == 401 and token_provider.invalidate(token):
+        # The installation token was revoked before its expiry; user tokens
+        # and App JWTs never match the cached one and are not retried.
+        headers = {**headers, **github_headers()}
+        response = _send(method, url, headers, urgent, **kwargs)
+    return response
+
+
+def _send(
+    method: str, url: str, headers: dict, urgent: bool, **kwargs
+) -> requests.Response:
+    key = rate_limiter.key_for(headers, url)
+    for attempt in range(GITHUB_RATE_LIMIT_RETRIES + 1):
+        rate_limiter.wait(key, urgent)
+        response = session.request(method, url, headers=headers, **kwargs)
+        rate_limiter.update(key, response)
+        if attempt == GITHUB_RATE_LIMIT_RETRIES:
+            break
+        if rate_limiter.retry_delay(key, response, attempt) is None:
+            break
+    return response
+
+
+def get_status() -> dict:
+    """
+    Telemetry of the GitHub integration: rate limit budgets, throughput,
+    throttling, response cache and token cache counters.
+    """
+    return {
+        "rate_limit": rate_limiter.status(),
+        "response_cache": {**response_cache.stats, **cache_stats},
+        "single_flight": dict(in_flight.stats),
+        "tokens": dict(token_provider.stats),
+    }
+
+
+def get_response(
+    url: str, params: dict = None, urgent: bool = True, project: Callable = None
+) -> CachedResponse:
+    """
+    Performs a GET against the GitHub API using the App installation token,
+    revalidating cached responses with ``If-None-Match``/``If-Modified-Since``.
+
+    Concurrent calls for the same URL are coalesced: only the first one
+    reaches GitHub and the others wait for and share its result.
+
+    Args:
+        url (str): The API URL.
+        params (dict): Optional query string parameters.
+        urgent (bool): See :func:`request`.
+        project (Callable): Optional function applied to a successful body
+            before it is cached, so only the fields in use are kept.
+
+    Returns:
+        CachedResponse: The decoded (and projected) body and parsed ``Link``
+        header, served from the cache when GitHub answers 304.
+
+    Raises:
+        requests.HTTPError: If GitHub answers with an error status.
+    """
+    key = requests.Request("GET", url, params=params).prepare().url
+    if project is not None:
+        key = f"{key}#{project.__module__}.{project.__qualname__}"
+    return in_flight.do(key, lambda: _fetch_response(key, url, params, urgent, project))
+
+
+def _fetch_response(
+    key: str, url: str, params: dict, urgent: bool, project: Callable
+) -> CachedResponse:
+    entry = response_cache.get(key)
+
+    headers = github_headers()
+    if entry is not None:
+        headers.update(entry.conditional_headers())
+
+    response = request("GET", url, headers=headers, params=params, urgent=urgent)
+    if response.status_code == 304 and entry is not None:
+        response_cache.touch(key)
+        cache_stats["revalidated"] += 1
+        return entry
+
+    if not 200 <= response.status_code < 300:
+        # Error bodies such as {"message": "Not Found"} must not be taken
+        # for data: iterating one as a page yields its keys.
+        raise requests.HTTPError(
+            f"GitHub answered {response.status_code} for {url}", response=response
+        )
+
+    cache_stats["fetched"] += 1
+    data = response.json()
+    if project is not None:
+        data = project(data)
+    fetched = CachedResponse(
+        data=data,
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        links=response.links,
+    )
+    if response.status_code == 200 and (fetched.etag or fetched.last_modified):
+        response_cache.set(key, fetched)
+    return fetched
+
+
+def get_json(
+    url: str, params: dict = None, urgent: bool = True, project: Callable = None
+):
+    """
+    Same as :func:`get_response`, returning only the decoded JSON body.
+    """
+    return get_response(url, params, urgent, project).data
+
+
+def _page_number(link: dict | None) -> int | None:
+    if not link:
+        return None
+    page = parse_qs(urlparse(link["url"]).query).get("page")
+    return int(page[0]) if page else None
+
+
+def paginate(
+    url: str,
+    params: dict = None,
+    max_items: int = None,
+    max_workers: int = GITHUB_PAGINATION_WORKERS,
+    urgent: bool = True,
+    project: Callable = None,
+):
+    """
+    Iterates over every item of a paginated GitHub list endpoint.
+
+    The first page tells how many pages exist through ``Link: rel="last"``;
+    the remaining pages are then fetched concurrently on a bounded pool and
+    yielded in order as soon as each one is available. Endpoints that only
+    advertise ``rel="next"`` are followed page by page.
+
+    Args:
+        url (str): The API URL of the list endpoint.
+        params (dict): Optional query string parameters.
+        max_items (int): Stop after yielding this many items.
+        max_workers (int): Maximum concurrent page requests.
+        urgent (bool): See :func:`request`.
+        project (Callable): See :func:`get_response`, applied to each page.
+
+    Yields:
+        The items of each page.
+    """
+    params = {**(params or {}), "per_page": PER_PAGE}
+    limit = max_items if max_items is not None else math.inf
+
+    first = get_response(url, params, urgent, project)
+    last_page = _page_number(first.links.get("last"))
+    if last_page is None:
+        yield from _take(_follow_next_links(first, urgent, project), limit)
+        return
+
+    if max_items is not None:
+        last_page = min(last_page, math.ceil(max_items / PER_PAGE))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pages = executor.map(
+            lambda page: get_json(url, {**params, "page": page}, urgent, project),
+            range(2, last_page + 1),
+        )
+        yield from _take(itertools.chain([first.data], pages), limit)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _follow_next_links(page: CachedResponse, urgent: bool, project: Callable):
+    yield page.data
+    while "next" in page.links:
+        page = get_response(page.links["next"]["url"], urgent=urgent, project=project)
+        yield page.data
+
+
+def _take(pages, limit):
+    for page in pages:
+        for item in page:
+            if limit <= 0:
+                return
+            limit -= 1
+            yield item
@@ -0,0 +1,166 @@
+from typing import NamedTuple
+
+from codaqui.settings import GITHUB_GRAPHQL_COMMENTS
+from github_service.client import request
+from github_service.sync import DEFAULT_REPOSITORY
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+ISSUE_WITH_COMMENTS_QUERY = """
+query ($owner: String!, $name: String!, $number: Int!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    issue(number: $number) {
+      databaseId
+      number
+      title
+      body
+      state
+      url
+      createdAt
+      updatedAt
+      closedAt
+      author { login }
+      assignees(first: 10) { nodes { login } }
+      labels(first: 20) { nodes { name } }
+      comments(first: $first, after: $after) {
+        totalCount
+        pageInfo { hasNextPage endCursor }
+        nodes {
+          databaseId
+          body
+          url
+          createdAt
+          updatedAt
+          author { login }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+class IssueThread(NamedTuple):
+    """
+    An issue and one page of its comments, shaped like the REST payloads so
+    they can go through :func:`github_service.sync.issue_fields`.
+    """
+
+    issue: dict
+    comments: list
+    next_cursor: str | None
+
+
+class GitHubGraphQLError(Exception):
+    pass
+
+
+def _rest_comment(node: dict) -> dict:
+    return {
+        "id": node["databaseId"],
+        "body": node["body"],
+        "html_url": node["url"],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "user": node["author"],
+    }
+
+
+def _rest_issue(node: dict) -> dict:
+    assignees = node["assignees"]["nodes"]
+    return {
+        "id": node["databaseId"],
+        "number": node["number"],
+        "title": node["title"],
+        "body": node["body"],
+        "state": node["state"].lower(),
+        "html_url": node["url"],
+        "created_at": node["createdAt"],
+        "updated_at": node["updatedAt"],
+        "closed_at": node["closedAt"],
+        "user": node["author"],
+        "assignee": assignees[0] if assignees else None,
+        "assignees": assignees,
+        "labels": node["labels"]["nodes"],
+        "comments": node["comments"]["totalCount"],
+    }
+
+
+def fetch_issue_thread(
+    issue_number: int,
+    repository: str = DEFAULT_REPOSITORY,
+    first: int = GITHUB_GRAPHQL_COMMENTS,
+    after: str = None,
+) -> IssueThread | None:
+    """
+    Fetches an issue with its assignees, labels and a page of comments in a
+    single GraphQL round-trip.
+
+    Args:
+        issue_number (int): The issue number.
+        repository (str): The repository full name.
+        first (int): How many comments to return.
+        after (str): Cursor returned by a previous call, to continue the
+            comment list.
+
+    Returns:
+        IssueThread | None: The issue and comments, or None when the number
+        does not belong to an issue (e.g. it is a pull request).
+
+    Raises:
+        GitHubGraphQLError: If GitHub answers with an error status or only
+            with errors.
+    """
+    owner, name = repository.split("/")
+    variables = {
+        "owner": owner,
+        "name": name,
+        "number": issue_number,
+        "first": first,
+        "after": after,
+    }
+    response = request(
+        "POST",
+        GRAPHQL_URL,
+        json={"query": ISSUE_WITH_COMMENTS_QUERY, "variables": variables},
+    )
+    if response.status_code != 200:
+        # Error answers carry no data; they must not read as a missing issue.
+        raise GitHubGraphQLError(
+            f"GitHub answered {response.status_code} to the GraphQL query"
+        )
+    payload = response.json()
+    if payload.get("errors") and not payload.get("data"):
+        raise GitHubGraphQLError(payload["errors"])
+
+    node = ((payload.get("data") or {}).get("repository") or {}).get("issue")
+    if node is None:
+        return None
+    comments = node["comments"]
+    page_info = comments["pageInfo"]
+    return IssueThread(
+        issue=_rest_issue(node),
+        comments=[_rest_comment(comment) for comment in comments["nodes"]],
+        next_cursor=page_info["endCursor"] if page_info["hasNextPage"] else None,
+    )
+
+
+def fetch_all_comments(
+    issue_number: int, thread: IssueThread, repository: str = DEFAULT_REPOSITORY
+) -> list:
+    """
+    Follows the comment cursor of ``thread`` until the last page.
+
+    Returns:
+        list | None: Every comment of the issue, shaped like the REST
+        payloads, or None if the issue disappeared during the walk.
+    """
+    comments = list(thread.comments)
+    cursor = thread.next_cursor
+    while cursor:
+        page = fetch_issue_thread(issue_number, repository, after=cursor)
+        if page is None:
+            return None
+        comments += page.comments
+        cursor = page.next_cursor
+    return comments
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="RepositorySync",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("repository", models.CharField(max_length=255, unique=True)),
+                ("synced_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Issue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("github_id", models.BigIntegerField(unique=True)),
+                ("repository", models.CharField(max_length=255)),
+                ("number", models.IntegerField()),
+                ("title", models.CharField(max_length=1024)),
+                ("body", models.TextField(blank=True, default="")),
+                ("state", models.CharField(max_length=16)),
+                ("html_url", models.URLField(max_length=512)),
+                (
+                    "user_login",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                (
+                    "assignee_login",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("labels", models.JSONField(blank=True, default=list)),
+                ("comments_count", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("closed_at", models.DateTimeField(blank=True, null=True)),
+                ("synced_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["repository", "state", "-updated_at"],
+                        name="issue_board_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("repository", "number"), name="unique_issue_number"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="IssueComment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("github_id", models.BigIntegerField(unique=True)),
+                (
+                    "user_login",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("body", models.TextField(blank=True, default="")),
+                ("html_url", models.URLField(max_length=512)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("synced_at", models.DateTimeField(auto_now=True)),
+                (
+                    "issue",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="comments",
+                        to="github_service.issue",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["issue", "created_at"], name="comment_issue_idx"
+                    )
+                ],
+            },
+        ),
+    ]
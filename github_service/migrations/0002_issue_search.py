@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:23
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("github_service", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="issue",
+            name="search_indexed_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="issue",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="issue",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="issue_search_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+# Local mirror of the GitHub issues shown on the intranet, kept up to date by
+# the webhook endpoint and bootstrapped with `manage.py sync_github_issues`.
+
+
+class Issue(models.Model):
+    github_id = models.BigIntegerField(unique=True)
+    repository = models.CharField(max_length=255)
+    number = models.IntegerField()
+    title = models.CharField(max_length=1024)
+    body = models.TextField(blank=True, default="")
+    state = models.CharField(max_length=16)
+    html_url = models.URLField(max_length=512)
+    user_login = models.CharField(max_length=255, blank=True, default="")
+    assignee_login = models.CharField(max_length=255, blank=True, default="")
+    labels = models.JSONField(default=list, blank=True)
+    comments_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    closed_at = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+    # Full-text index of the title, body and comments, maintained by
+    # `manage.py update_search_index`. ``search_indexed_at`` is the newest
+    # issue or comment ``updated_at`` included in the vector.
+    search_vector = SearchVectorField(null=True, editable=False)
+    search_indexed_at = models.DateTimeField(null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["repository", "number"], name="unique_issue_number"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["repository", "state", "-updated_at"],
+                name="issue_board_idx",
+            ),
+            GinIndex(fields=["search_vector"], name="issue_search_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.repository}#{self.number}"
+
+
+class IssueComment(models.Model):
+    github_id = models.BigIntegerField(unique=True)
+    issue = models.ForeignKey(
+        Issue,
+        on_delete=models.CASCADE,
+        related_name="comments",
+    )
+    user_login = models.CharField(max_length=255, blank=True, default="")
+    body = models.TextField(blank=True, default="")
+    html_url = models.URLField(max_length=512)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["issue", "created_at"], name="comment_issue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.issue} comment {self.github_id}"
+
+
+class RepositorySync(models.Model):
+    """
+    Repositories whose issues were fully mirrored at least once, so their
+    pages can be served from the database.
+    """
+
+    repository = models.CharField(max_length=255, unique=True)
+    synced_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.repository
@@ -0,0 +1,105 @@
+import logging
+from decimal import Decimal
+
+from social_django.models import UserSocialAuth
+
+from codaqui.settings import (
+    CODAPOINTS_ISSUE_CLOSED,
+    CODAPOINTS_PULL_REQUEST_MERGED,
+    CODAPOINTS_REVIEW_SUBMITTED,
+)
+from github_service.sync import is_pull_request
+from wallet.awards import Award, award_queue
+
+POINT_RULES = {
+    "issue_closed": Decimal(CODAPOINTS_ISSUE_CLOSED),
+    "pull_request_merged": Decimal(CODAPOINTS_PULL_REQUEST_MERGED),
+    "review_submitted": Decimal(CODAPOINTS_REVIEW_SUBMITTED),
+}
+
+
+def _issue_closed(payload: dict):
+    issue = payload["issue"]
+    if payload["action"] != "closed" or is_pull_request(issue):
+        return None, None, []
+    if issue.get("state_reason") not in (None, "completed"):
+        return None, None, []
+    subject = f"{payload['repository']['full_name']}#{issue['number']}"
+    return f"Issue concluída: {subject}", subject, issue.get("assignees") or []
+
+
+def _pull_request_merged(payload: dict):
+    pull_request = payload["pull_request"]
+    if payload["action"] != "closed" or not pull_request.get("merged"):
+        return None, None, []
+    subject = f"{payload['repository']['full_name']}#{pull_request['number']}"
+    return f"Pull request aceito: {subject}", subject, [pull_request["user"]]
+
+
+def _review_submitted(payload: dict):
+    pull_request = payload["pull_request"]
+    reviewer = payload["review"]["user"]
+    if payload["action"] != "submitted" or reviewer["id"] == pull_request["user"]["id"]:
+        return None, None, []
+    subject = f"{payload['repository']['full_name']}#{pull_request['number']}"
+    return f"Revisão de pull request: {subject}", subject, [reviewer]
+
+
+# GitHub event -> (rule, function returning the description, the subject
+# (``owner/repo#number``) and the GitHub accounts that earn the points).
+# The rule and subject make up the award reference, so reopening and closing
+# an issue again, or reviewing a pull request twice, pays only once.
+EVENT_RULES = {
+    "issues": ("issue_closed", _issue_closed),
+    "pull_request": ("pull_request_merged", _pull_request_merged),
+    "pull_request_review": ("review_submitted", _review_submitted),
+}
+
+
+def awards_for_event(event: str, payload: dict) -> list[Award]:
+    """
+    Maps a webhook delivery to the CodaPoints it earns through
+    :data:`POINT_RULES`. GitHub accounts are matched to users by the id
+    stored on login, in a single query.
+
+    Args:
+        event (str): The ``X-GitHub-Event`` header.
+        payload (dict): The decoded delivery body.
+
+    Returns:
+        list[Award]: The awards, empty if the event earns nothing.
+    """
+    if event not in EVENT_RULES:
+        return []
+    rule, match = EVENT_RULES[event]
+    value = POINT_RULES[rule]
+    if value <= 0:
+        return []
+    description, subject, accounts = match(payload)
+    if not accounts:
+        return []
+
+    users = dict(
+        UserSocialAuth.objects.filter(
+            provider="github", uid__in=[str(account["id"]) for account in accounts]
+        ).values_list("uid", "user_id")
+    )
+    awards = []
+    for account in accounts:
+        user_id = users.get(str(account["id"]))
+        if user_id is None:
+            logging.info(f"No user for GitHub account {account['login']}, no points")
+            continue
+        reference = f"{rule}:{subject}:{account['id']}"
+        awards.append(Award(user_id, value, description, reference))
+    return awards
+
+
+def queue_awards(event: str, payload: dict) -> list[Award]:
+    """
+    Queues the CodaPoints earned by a webhook delivery; they are posted in
+    the next batch of :data:`wallet.awards.award_queue`.
+    """
+    awards = awards_for_event(event, payload)
+    award_queue.put(awards)
+    return awards
@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+
+class GitHubRateLimitError(Exception):
+    """
+    Raised when a call would have to wait longer than allowed for the budget.
+    """
+
+
+@dataclass
+class RateLimitBudget:
+    limit: int | None = None
+    remaining: int | None = None
+    reset_at: float = 0.0
+    blocked_until: float = 0.0
+
+
+class RateLimiter:
+    """
+    Tracks the GitHub rate limit budget of every token in use.
+
+    GitHub counts search, GraphQL and the rest of the REST API against
+    separate budgets, so each is kept per ``(token, resource)``. The resource
+    is guessed from the URL before a request and taken from the
+    ``X-RateLimit-Resource`` header once GitHub answers.
+
+    Budgets are read from the ``X-RateLimit-*`` headers of each response.
+    Once the remaining share drops below ``slowdown_threshold``, non-urgent
+    calls are spaced so the rest of the budget lasts until the reset.
+    Secondary limits (``Retry-After``) and exhausted budgets block the token
+    for every caller until GitHub allows requests again.
+
+    Args:
+        slowdown_threshold (float): Remaining/limit ratio that starts throttling.
+        max_wait (float): Longest a single call may sleep before giving up with
+            :class:`GitHubRateLimitError`.
+    """
+
+    def __init__(self, slowdown_threshold: float = 0.2, max_wait: float = 10):
+        self.slowdown_threshold = slowdown_threshold
+        self.max_wait = max_wait
+        self._budgets = {}
+        self._lock = threading.Lock()
+        self._recent_requests = deque()
+        self.stats = {"requests": 0, "throttled": 0, "throttle_seconds": 0.0}
+
+    @staticmethod
+    def resource_for(url: str) -> str:
+        path = urlsplit(url).path
+        if path.startswith("/search/code"):
+            return "code_search"
+        if path.startswith("/search/"):
+            return "search"
+        if path.startswith("/graphql"):
+            return "graphql"
+        return "core"
+
+    @classmethod
+    def key_for(cls, headers: dict, url: str) -> tuple[str, str]:
+        # Keep only a digest of the token in memory.
+        authorization = headers.get("Authorization", "")
+        token = hashlib.sha256(authorization.encode()).hexdigest()[:16]
+        return token, cls.resource_for(url)
+
+    @staticmethod
+    def _answered_key(key: tuple[str, str], response) -> tuple[str, str]:
+        # GitHub names the budget it charged; trust it over the URL guess.
+        resource = response.headers.get("X-RateLimit-Resource")
+        return (key[0], resource) if resource else key
+
+    def _delay(self, budget: RateLimitBudget, urgent: bool, now: float) -> float:
+        if budget.blocked_until > now:
+            return budget.blocked_until - now
+        if budget.remaining is None or not budget.limit or budget.reset_at <= now:
+            return 0.0
+        if budget.remaining == 0:
+            return budget.reset_at - now
+        if urgent or budget.remaining / budget.limit >= self.slowdown_threshold:
+            return 0.0
+        # Spread what is left of the budget evenly until the window resets.
+        return (budget.reset_at - now) / budget.remaining
+
+    def wait(self, key: tuple[str, str], urgent: bool = False):
+        """
+        Sleeps as long as the token's budget for the resource requires before
+        a request.
+
+        Raises:
+            GitHubRateLimitError: If the wait would exceed ``max_wait``.
+        """
+        with self._lock:
+            budget = self._budgets.get(key, RateLimitBudget())
+            delay = self._delay(budget, urgent, time.time())
+        if delay <= 0:
+            return
+        if delay > self.max_wait:
+            raise GitHubRateLimitError(
+                f"GitHub rate limit exhausted, retry in {int(delay)} seconds"
+            )
+        with self._lock:
+            self.stats["throttled"] += 1
+            self.stats["throttle_seconds"] += delay
+        time.sleep(delay)
+
+    def update(self, key: tuple[str, str], response):
+        """
+        Records the budget reported by a GitHub response.
+        """
+        headers = response.headers
+        now = time.time()
+        with self._lock:
+            self.stats["requests"] += 1
+            self._recent_requests.append(now)
+            while self._recent_requests and self._recent_requests[0] < now - 60:
+                self._recent_requests.popleft()
+
+            if "X-RateLimit-Remaining" not in headers:
+                return
+            key = self._answered_key(key, response)
+            budget = self._budgets.setdefault(key, RateLimitBudget())
+            budget.limit = int(headers.get("X-RateLimit-Limit", 0)) or None
+            budget.remaining = int(headers["X-RateLimit-Remaining"])
+            budget.reset_at = float(headers.get("X-RateLimit-Reset", 0))
+            if (
+                budget.limit
+                and budget.remaining / budget.limit < self.slowdown_threshold
+            ):
+                logging.warning(
+                    f"GitHub {key[1]} rate limit low: "
+                    f"{budget.remaining}/{budget.limit} remaining"
+                )
+
+    def retry_delay(self, key: tuple[str, str], response, attempt: int) -> float | None:
+        """
+        Decides whether a rate limited response should be retried.
+
+        Args:
+            key (tuple[str, str]): The token and resource key.
+            response: The GitHub response.
+            attempt (int): Zero-based number of the attempt that just failed.
+
+        Returns:
+            float | None: Seconds the token is now blocked for, or None when
+            the response was not rate limited.
+        """
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            delay = float(retry_after)
+        elif response.headers.get("X-RateLimit-Remaining") == "0":
+            delay = float(response.headers.get("X-RateLimit-Reset", 0)) - time.time()
+        elif response.status_code == 429:
+            delay = 2**attempt
+        else:
+            # A 403 without rate limit headers is a permission error.
+            return None
+        # Jitter keeps workers that were blocked together from retrying in lockstep.
+        delay = max(delay, 1.0) * random.uniform(1.0, 1.25)
+        key = self._answered_key(key, response)
+        with self._lock:
+            budget = self._budgets.setdefault(key, RateLimitBudget())
+            budget.blocked_until = max(budget.blocked_until, time.time() + delay)
+        return delay
+
+    def status(self) -> dict:
+        """
+        Current budgets and throughput, for dashboards and diagnostics.
+        """
+        now = time.time()
+        with self._lock:
+            while self._recent_requests and self._recent_requests[0] < now - 60:
+                self._recent_requests.popleft()
+            return {
+                "requests_per_minute": len(self._recent_requests),
+                "budgets": {
+                    f"{token}:{resource}": {
+                        "limit": budget.limit,
+                        "remaining": budget.remaining,
+                        "reset_in": max(0, int(budget.reset_at - now)),
+                        "blocked_for": max(0, int(budget.blocked_until - now)),
+                    }
+                    for (token, resource), budget in self._budgets.items()
+                    if budget.reset_at > now or budget.blocked_until > now
+                },
+                **self.stats,
+            }
@@ -0,0 +1,227 @@
+import re
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
+
+from codaqui.settings import GITHUB_PREVIEW_WORDS, GITHUB_RENDER_CACHE_ENTRIES
+from github_service.cache import CachedResponse, LRUCache
+
+# Rendered HTML keyed by (kind, html_url, updated_at): an edited body
+# gets a new key, so entries never need to be invalidated, only evicted.
+render_cache = LRUCache(max_entries=GITHUB_RENDER_CACHE_ENTRIES)
+
+FENCE = re.compile(r"^\s*(```|~~~)")
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+LIST_ITEM = re.compile(r"^\s*(?:([-*+])|\d+[.)])\s+(.*)$")
+QUOTE = re.compile(r"^\s*&gt;\s?(.*)$")
+RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+TASK = re.compile(r"^\[([ xX])\]\s+")
+# Deeper ``>`` markers are shown as text; each level is one more pass over
+# the quoted lines and one more frame of recursion.
+MAX_QUOTE_DEPTH = 8
+
+# Every span stops at the first delimiter it could close on, so a failed
+# match gives up after a single scan instead of trying each later one: bodies
+# full of unmatched ``**``, ``[`` or ``](http://`` render in linear time.
+# URLs cannot run across brackets or parentheses for the same reason.
+CODE_SPAN = re.compile(r"`([^`]+)`")
+IMAGE = re.compile(r"!\[([^\[\]]*)\]\((https?://[^\s()\[\]]+)\)")
+LINK = re.compile(r"\[([^\[\]]+)\]\((https?://[^\s()\[\]]+)\)")
+AUTOLINK = re.compile(r"\bhttps?://[^\s<]*[^\s<.,;:!?)]")
+BOLD = re.compile(
+    r"\*\*(?=\S)((?:[^*]|\*(?!\*))+)(?<=\S)\*\*|\b__(?=\S)((?:[^_]|_(?!_))+)(?<=\S)__\b"
+)
+ITALIC = re.compile(r"\*(?=\S)([^*]+)(?<=\S)\*|\b_(?=\S)([^_]+)(?<=\S)_\b")
+STRIKE = re.compile(r"~~(?=\S)((?:[^~]|~(?!~))+)(?<=\S)~~")
+PLACEHOLDER = re.compile("\x00(\\d+)\x00")
+
+
+def _inline(text: str) -> str:
+    # ``text`` is already escaped. Code spans, images and links are swapped
+    # for placeholders first so emphasis and autolinks never reach inside
+    # them or their URLs.
+    stash = []
+
+    def keep(html: str) -> str:
+        stash.append(html)
+        return f"\x00{len(stash) - 1}\x00"
+
+    text = CODE_SPAN.sub(lambda m: keep(f"<code>{m[1]}</code>"), text)
+    text = IMAGE.sub(lambda m: keep(f'<img src="{m[2]}" alt="{m[1]}">'), text)
+    text = LINK.sub(
+        lambda m: keep(f'<a href="{m[2]}" rel="nofollow noopener">{m[1]}</a>'),
+        text,
+    )
+    text = AUTOLINK.sub(
+        lambda m: keep(f'<a href="{m[0]}" rel="nofollow noopener">{m[0]}</a>'),
+        text,
+    )
+    text = BOLD.sub(lambda m: f"<strong>{m[1] or m[2]}</strong>", text)
+    text = ITALIC.sub(lambda m: f"<em>{m[1] or m[2]}</em>", text)
+    text = STRIKE.sub(lambda m: f"<del>{m[1]}</del>", text)
+    return PLACEHOLDER.sub(lambda m: stash[int(m[1])], text)
+
+
+def _list_item(text: str) -> str:
+    task = TASK.match(text)
+    if task is None:
+        return f"<li>{_inline(text)}</li>"
+    checked = " checked" if task[1] in "xX" else ""
+    checkbox = f'<input type="checkbox" disabled{checked}>'
+    return f"<li>{checkbox} {_inline(text[task.end():])}</li>"
+
+
+def _blocks(lines: list[str], depth: int = 0) -> list[str]:
+    html = []
+    paragraph = []
+    items = []
+    list_tag = None
+
+    def close_paragraph():
+        if paragraph:
+            html.append(f"<p>{'<br>'.join(_inline(line) for line in paragraph)}</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if items:
+            html.append(f"<{list_tag}>{''.join(items)}</{list_tag}>")
+            items.clear()
+        list_tag = None
+
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+
+        fence = FENCE.match(line)
+        if fence:
+            close_paragraph()
+            close_list()
+            code = []
+            while index < len(lines) and not lines[index].strip().startswith(fence[1]):
+                code.append(lines[index])
+                index += 1
+            index += 1
+            code = "\n".join(code)
+            html.append(f"<pre><code>{code}</code></pre>")
+            continue
+
+        if depth < MAX_QUOTE_DEPTH and QUOTE.match(line):
+            close_paragraph()
+            close_list()
+            quoted = [QUOTE.match(line)[1]]
+            while index < len(lines) and QUOTE.match(lines[index]):
+                quoted.append(QUOTE.match(lines[index])[1])
+                index += 1
+            inner = "".join(_blocks(quoted, depth + 1))
+            html.append(f"<blockquote>{inner}</blockquote>")
+            continue
+
+        heading = HEADING.match(line)
+        item = LIST_ITEM.match(line)
+        if not line.strip():
+            close_paragraph()
+            close_list()
+        elif heading:
+            close_paragraph()
+            close_list()
+            level = len(heading[1])
+            html.append(f"<h{level}>{_inline(heading[2])}</h{level}>")
+        elif RULE.match(line):
+            close_paragraph()
+            close_list()
+            html.append("<hr>")
+        elif item:
+            close_paragraph()
+            tag = "ul" if item[1] else "ol"
+            if tag != list_tag:
+                close_list()
+                list_tag = tag
+            items.append(_list_item(item[2]))
+        elif items:
+            # A continuation line belongs to the last list item.
+            items[-1] = f"{items[-1][:-5]}<br>{_inline(line.strip())}</li>"
+        else:
+            paragraph.append(line.strip())
+
+    close_paragraph()
+    close_list()
+    return html
+
+
+def render_markdown(text: str) -> str:
+    """
+    Renders the GitHub Flavored Markdown subset used in issues to HTML.
+
+    The text is escaped before any markup is added and only ``http(s)`` links
+    and images are produced, so raw HTML in a body is shown, never executed.
+
+    Args:
+        text (str): The Markdown source.
+
+    Returns:
+        str: Safe HTML.
+    """
+    # NUL is reserved for the inline placeholders.
+    text = escape(text.replace("\x00", ""))
+    lines = text.replace("\r\n", "\n").split("\n")
+    return mark_safe("\n".join(_blocks(lines)))
+
+
+def _cache_key(kind: str, obj) -> tuple:
+    # The URL tells issues and comments apart and is the same for a model
+    # instance and its summary.
+    return (kind, obj.html_url, obj.updated_at)
+
+
+def render_body(obj) -> str:
+    """
+    Rendered body of an issue or comment, cached per version of the body.
+
+    Args:
+        obj: An issue or comment, either a model instance or a summary.
+
+    Returns:
+        str: Safe HTML.
+    """
+    key = _cache_key("body", obj)
+    entry = render_cache.get(key)
+    if entry is None:
+        entry = CachedResponse(data=render_markdown(obj.body))
+        render_cache.set(key, entry)
+    return entry.data
+
+
+def render_preview(obj, words: int = GITHUB_PREVIEW_WORDS) -> str:
+    """
+    The first ``words`` words of :func:`render_body`, with tags closed.
+    Cached on its own so the issue board does not truncate every body again.
+    """
+    key = _cache_key(f"preview:{words}", obj)
+    entry = render_cache.get(key)
+    if entry is None:
+        preview = Truncator(render_body(obj)).words(words, html=True)
+        entry = CachedResponse(data=mark_safe(preview))
+        render_cache.set(key, entry)
+    return entry.data
+
+
+def attach_rendered_bodies(objects, preview: bool = False):
+    """
+    Sets ``body_html`` (or ``preview_html``) on every object for templates.
+
+    Args:
+        objects: Issues or comments.
+        preview (bool): Attach truncated previews instead of full bodies.
+
+    Returns:
+        The same objects.
+    """
+    for obj in objects:
+        if preview:
+            obj.preview_html = render_preview(obj)
+        else:
+            obj.body_html = render_body(obj)
+    return objects
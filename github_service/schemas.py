@@ -0,0 +1,97 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+
+from github_service.sync import (
+    DEFAULT_REPOSITORY,
+    comment_fields,
+    is_pull_request,
+    issue_fields,
+)
+
+
+@dataclass(slots=True)
+class IssueSummary:
+    """
+    The part of a GitHub issue the pages use. Field names match
+    :class:`github_service.models.Issue`, so templates accept either.
+    """
+
+    github_id: int
+    repository: str
+    number: int
+    title: str
+    body: str
+    state: str
+    html_url: str
+    user_login: str
+    assignee_login: str
+    labels: list
+    comments_count: int
+    created_at: datetime
+    updated_at: datetime
+    closed_at: datetime | None
+    body_html: str = ""
+    preview_html: str = ""
+
+    @classmethod
+    def from_json(cls, data: dict, repository: str = DEFAULT_REPOSITORY):
+        return cls(**issue_fields(data, repository))
+
+
+@dataclass(slots=True)
+class CommentSummary:
+    """
+    The part of a GitHub issue comment the pages use. Field names match
+    :class:`github_service.models.IssueComment`.
+    """
+
+    github_id: int
+    user_login: str
+    body: str
+    html_url: str
+    created_at: datetime
+    updated_at: datetime
+    body_html: str = ""
+
+    @classmethod
+    def from_json(cls, data: dict):
+        return cls(**comment_fields(data))
+
+
+ISSUE_SUMMARY_FIELDS = [
+    field.name for field in fields(IssueSummary) if not field.name.endswith("_html")
+]
+COMMENT_SUMMARY_FIELDS = [
+    field.name for field in fields(CommentSummary) if not field.name.endswith("_html")
+]
+
+
+def issue_summaries(queryset) -> list[IssueSummary]:
+    """
+    Reads issues from the mirror as summaries, without building model
+    instances.
+    """
+    return [IssueSummary(**row) for row in queryset.values(*ISSUE_SUMMARY_FIELDS)]
+
+
+def comment_summaries(queryset) -> list[CommentSummary]:
+    """
+    Reads issue comments from the mirror as summaries.
+    """
+    return [CommentSummary(**row) for row in queryset.values(*COMMENT_SUMMARY_FIELDS)]
+
+
+def project_issue_page(repository: str = DEFAULT_REPOSITORY):
+    """
+    Builds the projection applied to a page of the issues list endpoint
+    before it is cached: pull requests are dropped and issues summarized.
+    """
+
+    def project(page: list) -> list[IssueSummary]:
+        return [
+            IssueSummary.from_json(data, repository)
+            for data in page
+            if not is_pull_request(data)
+        ]
+
+    return project
@@ -0,0 +1,105 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db.models import (
+    Exists,
+    F,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+)
+from django.db.models.functions import Coalesce, Greatest
+
+from github_service.models import Issue, IssueComment
+
+SEARCH_CONFIG = "portuguese"
+
+
+def _comments_of_issue(aggregate):
+    return Subquery(
+        IssueComment.objects.filter(issue=OuterRef("pk"))
+        .values("issue")
+        .annotate(value=aggregate)
+        .values("value")
+    )
+
+
+def stale_issues(queryset=None):
+    """
+    Issues whose title, body or comments changed since they were indexed.
+    """
+    queryset = Issue.objects.all() if queryset is None else queryset
+    newer_comment = IssueComment.objects.filter(
+        issue=OuterRef("pk"), updated_at__gt=OuterRef("search_indexed_at")
+    )
+    return queryset.filter(
+        Q(search_indexed_at__isnull=True)
+        | Q(search_indexed_at__lt=F("updated_at"))
+        | Exists(newer_comment)
+    )
+
+
+def update_search_index(repository: str = None, full: bool = False) -> int:
+    """
+    Refreshes the full-text vectors of the mirrored issues in one UPDATE.
+
+    The title weighs the most, then the body, then the comments. Only issues
+    changed since they were last indexed are touched unless ``full`` is set.
+
+    Args:
+        repository (str): Limit to one repository full name.
+        full (bool): Rebuild every vector, e.g. after changing the weights.
+
+    Returns:
+        int: The number of issues indexed.
+    """
+    queryset = Issue.objects.all()
+    if repository:
+        queryset = queryset.filter(repository=repository)
+    if not full:
+        queryset = stale_issues(queryset)
+
+    comments_text = _comments_of_issue(StringAgg("body", delimiter="\n"))
+    newest_comment = _comments_of_issue(Max("updated_at"))
+    return Issue.objects.filter(pk__in=queryset.values("pk")).update(
+        search_vector=(
+            SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("body", weight="B", config=SEARCH_CONFIG)
+            + SearchVector(
+                Coalesce(comments_text, Value(""), output_field=TextField()),
+                weight="C",
+                config=SEARCH_CONFIG,
+            )
+        ),
+        search_indexed_at=Greatest(
+            "updated_at", Coalesce(newest_comment, "updated_at")
+        ),
+    )
+
+
+def search_issues(text: str, repository: str = None):
+    """
+    Ranked full-text search over the indexed issues, served by the GIN index.
+
+    Args:
+        text (str): What the student typed; supports quotes, ``or`` and ``-``.
+        repository (str): Limit to one repository full name.
+
+    Returns:
+        QuerySet: Matching issues, best ranked first.
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+    queryset = Issue.objects.filter(search_vector=query)
+    if repository:
+        queryset = queryset.filter(repository=repository)
+    return (
+        queryset.annotate(rank=SearchRank(F("search_vector"), query))
+        .defer("search_vector")
+        .order_by("-rank", "-updated_at")
+    )
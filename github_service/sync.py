@@ -0,0 +1,168 @@
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from codaqui.settings import GITHUB_ORGANIZATION, GITHUB_REPOSITORY
+from github_service.client import paginate
+from github_service.models import Issue, IssueComment, RepositorySync
+
+DEFAULT_REPOSITORY = f"{GITHUB_ORGANIZATION}/{GITHUB_REPOSITORY}"
+
+ISSUE_UPDATE_FIELDS = [
+    "repository",
+    "number",
+    "title",
+    "body",
+    "state",
+    "html_url",
+    "user_login",
+    "assignee_login",
+    "labels",
+    "comments_count",
+    "created_at",
+    "updated_at",
+    "closed_at",
+    "synced_at",
+]
+COMMENT_UPDATE_FIELDS = [
+    "issue",
+    "user_login",
+    "body",
+    "html_url",
+    "created_at",
+    "updated_at",
+    "synced_at",
+]
+
+
+def _login(user: dict | None) -> str:
+    return user["login"] if user else ""
+
+
+def is_pull_request(data: dict) -> bool:
+    """
+    The issues API also returns pull requests, which are not mirrored.
+    """
+    return "pull_request" in data
+
+
+def issue_fields(data: dict, repository: str = DEFAULT_REPOSITORY) -> dict:
+    """
+    Maps a GitHub issue payload to :class:`Issue` field values.
+    """
+    return {
+        "github_id": data["id"],
+        "repository": repository,
+        "number": data["number"],
+        "title": data["title"],
+        "body": data.get("body") or "",
+        "state": data["state"],
+        "html_url": data["html_url"],
+        "user_login": _login(data.get("user")),
+        "assignee_login": _login(data.get("assignee")),
+        "labels": [label["name"] for label in data.get("labels", [])],
+        "comments_count": data.get("comments", 0),
+        "created_at": parse_datetime(data["created_at"]),
+        "updated_at": parse_datetime(data["updated_at"]),
+        "closed_at": data.get("closed_at") and parse_datetime(data["closed_at"]),
+    }
+
+
+def comment_fields(data: dict) -> dict:
+    """
+    Maps a GitHub issue comment payload to :class:`IssueComment` field values.
+    """
+    return {
+        "github_id": data["id"],
+        "user_login": _login(data.get("user")),
+        "body": data.get("body") or "",
+        "html_url": data["html_url"],
+        "created_at": parse_datetime(data["created_at"]),
+        "updated_at": parse_datetime(data["updated_at"]),
+    }
+
+
+def _upsert(model, values: dict):
+    # Webhook deliveries may arrive out of order: never let an older payload
+    # overwrite a newer row.
+    with transaction.atomic():
+        instance, created = model.objects.select_for_update().get_or_create(
+            github_id=values["github_id"], defaults=values
+        )
+        if not created and instance.updated_at <= values["updated_at"]:
+            for field, value in values.items():
+                setattr(instance, field, value)
+            instance.save()
+    return instance
+
+
+def upsert_issue(data: dict, repository: str = DEFAULT_REPOSITORY) -> Issue:
+    """
+    Creates or updates the mirrored copy of an issue.
+    """
+    return _upsert(Issue, issue_fields(data, repository))
+
+
+def upsert_comment(data: dict, issue: Issue) -> IssueComment:
+    """
+    Creates or updates the mirrored copy of an issue comment.
+    """
+    return _upsert(IssueComment, {**comment_fields(data), "issue": issue})
+
+
+def store_issue_thread(
+    issue_data: dict, comments: list, repository: str = DEFAULT_REPOSITORY
+) -> tuple[Issue, list[IssueComment]]:
+    """
+    Creates or updates the mirrored copy of an issue and its comments.
+    """
+    issue = upsert_issue(issue_data, repository)
+    return issue, [upsert_comment(data, issue) for data in comments]
+
+
+def resync_repository(repository: str = DEFAULT_REPOSITORY) -> tuple[int, int]:
+    """
+    Mirrors every issue and comment of a repository in a few bulk upserts.
+
+    Args:
+        repository (str): The repository full name, e.g. ``codaqui/tutor``.
+
+    Returns:
+        tuple[int, int]: The number of issues and comments synced.
+    """
+    url = f"https://api.github.com/repos/{repository}"
+    issues = [
+        Issue(**issue_fields(data, repository))
+        for data in paginate(f"{url}/issues", {"state": "all"}, urgent=False)
+        if not is_pull_request(data)
+    ]
+    Issue.objects.bulk_create(
+        issues,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["github_id"],
+        update_fields=ISSUE_UPDATE_FIELDS,
+    )
+
+    issue_ids = dict(
+        Issue.objects.filter(repository=repository).values_list("number", "id")
+    )
+    comments = []
+    for data in paginate(f"{url}/issues/comments", urgent=False):
+        number = int(data["issue_url"].rsplit("/", 1)[1])
+        if number in issue_ids:
+            comments.append(
+                IssueComment(issue_id=issue_ids[number], **comment_fields(data))
+            )
+    IssueComment.objects.bulk_create(
+        comments,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["github_id"],
+        update_fields=COMMENT_UPDATE_FIELDS,
+    )
+
+    RepositorySync.objects.update_or_create(
+        repository=repository, defaults={"synced_at": timezone.now()}
+    )
+    return len(issues), len(comments)
@@ -1,3 +1,916 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from github_service import client, points
+from github_service.auth import GitHubAppTokenProvider
+from github_service.board import board_repositories
+from github_service.cache import CachedResponse, LRUCache, SingleFlight
+from github_service.graphql import GitHubGraphQLError, fetch_issue_thread
+from github_service.models import Issue, IssueComment, RepositorySync
+from github_service.ratelimit import GitHubRateLimitError, RateLimiter
+from github_service.rendering import (
+    render_body,
+    render_cache,
+    render_markdown,
+    render_preview,
+)
+from github_service.schemas import IssueSummary, project_issue_page
+from github_service.search import search_issues, update_search_index
+from github_service.sync import (
+    DEFAULT_REPOSITORY,
+    issue_fields,
+    upsert_comment,
+    upsert_issue,
+)
+from wallet.awards import AwardQueue
+from wallet.models import Activities, Wallet
+
+
+def token_response(token: str, expires_in: int = 3600):
+    expires_at = timezone.now() + timedelta(seconds=expires_in)
+    response = mock.Mock(status_code=201)
+    response.json.return_value = {
+        "token": token,
+        "expires_at": expires_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    return response
+
+
+@mock.patch("github_service.auth.JWT")
+@mock.patch("github_service.auth.jwk_from_pem")
+class TestGitHubAppTokenProvider(SimpleTestCase):
+
+    def setUp(self):
+        self.key_file = tempfile.NamedTemporaryFile(suffix=".pem")
+        self.key_file.write(b"fake-key")
+        self.key_file.flush()
+        self.provider = GitHubAppTokenProvider(
+            private_key_file=self.key_file.name, app_id="1", install_id="2"
+        )
+
+    def tearDown(self):
+        self.key_file.close()
+
+    def test_access_token_is_reused(self, jwk_from_pem, jwt):
+        """Test if the installation token is minted once and then served from cache"""
+        with mock.patch("github_service.auth.requests.post") as post:
+            post.return_value = token_response("token-1")
+            assert self.provider.get_access_token() == "token-1"
+            assert self.provider.get_access_token() == "token-1"
+        assert post.call_count == 1
+        assert jwk_from_pem.call_count == 1
+        assert self.provider.stats["token_refreshes"] == 1
+        assert self.provider.stats["token_hits"] == 1
+
+    def test_access_token_refreshed_near_expiry(self, jwk_from_pem, jwt):
+        """Test if a token about to expire is replaced by a new one"""
+        with mock.patch("github_service.auth.requests.post") as post:
+            post.side_effect = [
+                token_response("token-1", 60),
+                token_response("token-2"),
+            ]
+            assert self.provider.get_access_token() == "token-1"
+            assert self.provider.get_access_token() == "token-2"
+        # The signing key is parsed only once for both mints.
+        assert jwk_from_pem.call_count == 1
+
+    def test_jwt_is_reused_until_close_to_expiry(self, jwk_from_pem, jwt):
+        """Test if the App JWT is signed again only when close to expiring"""
+        jwt.return_value.encode.side_effect = ["jwt-1", "jwt-2"]
+        assert self.provider.get_jwt() == "jwt-1"
+        assert self.provider.get_jwt() == "jwt-1"
+        with mock.patch(
+            "github_service.auth.time.time", return_value=time.time() + 590
+        ):
+            assert self.provider.get_jwt() == "jwt-2"
+        assert self.provider.stats["jwt_refreshes"] == 2
+
+    @mock.patch("github_service.client.session.request")
+    def test_revoked_token_is_minted_again_once(self, request, jwk_from_pem, jwt):
+        """Test if a 401 to the installation token retries with a new token"""
+        request.side_effect = [
+            github_response(401, {"message": "Bad credentials"}),
+            github_response(200, {"ok": True}),
+            github_response(401, {"message": "Bad credentials"}),
+        ]
+        with (
+            mock.patch("github_service.auth.requests.post") as post,
+            mock.patch.object(client, "token_provider", self.provider),
+            mock.patch.object(
+                client, "generate_access_token", self.provider.get_access_token
+            ),
+        ):
+            post.side_effect = [token_response("token-1"), token_response("token-2")]
+            response = client.request("GET", "https://api.github.com/app")
+            assert response.status_code == 200
+            retried = request.call_args.kwargs["headers"]["Authorization"]
+            assert retried == "Bearer token-2"
+            # User tokens are not the App's to replace.
+            response = client.request(
+                "GET", "https://api.github.com/user", headers={"Authorization": "x"}
+            )
+            assert response.status_code == 401
+        assert post.call_count == 2
+        assert request.call_count == 3
+
+
+class TestLRUCache(SimpleTestCase):
+
+    def test_least_recently_used_is_evicted(self):
+        """Test if the cache drops the least recently used entry when full"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", CachedResponse(data=1))
+        cache.set("b", CachedResponse(data=2))
+        cache.get("a")
+        cache.set("c", CachedResponse(data=3))
+        assert cache.get("b") is None
+        assert cache.get("a").data == 1
+        assert cache.stats["evictions"] == 1
+
+    def test_expired_entries_are_dropped(self):
+        """Test if entries older than max_age are not served"""
+        cache = LRUCache(max_entries=2, max_age=10)
+        cache.set("a", CachedResponse(data=1, stored_at=time.monotonic() - 11))
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+
+def github_response(status_code, data=None, headers=None):
+    response = mock.Mock(status_code=status_code, headers=headers or {})
+    response.json.return_value = data
+    return response
+
+
+@mock.patch("github_service.client.github_headers", side_effect=dict)
+class TestConditionalGet(SimpleTestCase):
+
+    def setUp(self):
+        client.response_cache.clear()
+
+    def test_not_modified_serves_cached_body(self, github_headers):
+        """Test if a 304 answer returns the stored body and sends the validators"""
+        url = "https://api.github.com/repos/codaqui/tutor/issues"
+        with mock.patch("github_service.client.session.request") as get:
+            get.side_effect = [
+                github_response(200, [{"number": 1}], {"ETag": '"abc"'}),
+                github_response(304),
+            ]
+            assert client.get_json(url) == [{"number": 1}]
+            assert client.get_json(url) == [{"number": 1}]
+        assert get.call_args.kwargs["headers"]["If-None-Match"] == '"abc"'
+
+    def test_cache_holds_projected_issues(self, github_headers):
+        """Test if issue pages are cached as summaries without pull requests"""
+        url = "https://api.github.com/repos/codaqui/tutor/issues"
+        pull_request = issue_payload(2, pull_request={"url": "..."})
+        with mock.patch("github_service.client.session.request") as get:
+            get.side_effect = [
+                github_response(200, [issue_payload(1), pull_request], {"ETag": "x"}),
+                github_response(304),
+            ]
+            project = project_issue_page(DEFAULT_REPOSITORY)
+            first = client.get_json(url, project=project)
+            assert client.get_json(url, project=project) is first
+        assert [type(issue) for issue in first] == [IssueSummary]
+        assert first[0].title == "Issue 1"
+        assert not hasattr(first[0], "__dict__")
+
+    def test_responses_without_validators_are_not_cached(self, github_headers):
+        """Test if responses lacking ETag and Last-Modified skip the cache"""
+        url = "https://api.github.com/repos/codaqui/tutor/issues/1"
+        with mock.patch("github_service.client.session.request") as get:
+            get.return_value = github_response(200, {"number": 1})
+            client.get_json(url)
+            client.get_json(url)
+        assert "If-None-Match" not in get.call_args.kwargs["headers"]
+        assert len(client.response_cache) == 0
+
+
+@mock.patch("github_service.client.github_headers", side_effect=dict)
+class TestSingleFlight(SimpleTestCase):
+
+    def setUp(self):
+        client.response_cache.clear()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def slow_response(self, *args, **kwargs):
+        self.started.set()
+        self.release.wait(timeout=5)
+        return github_response(200, [{"number": 1}])
+
+    def test_concurrent_reads_share_one_request(self, github_headers):
+        """Test if identical concurrent reads reach GitHub only once"""
+        url = "https://api.github.com/repos/codaqui/tutor/issues"
+        results = []
+        with mock.patch(
+            "github_service.client.session.request", side_effect=self.slow_response
+        ) as get:
+            threads = [
+                threading.Thread(target=lambda: results.append(client.get_json(url)))
+                for _ in range(3)
+            ]
+            threads[0].start()
+            self.started.wait(timeout=5)
+            for thread in threads[1:]:
+                thread.start()
+            time.sleep(0.05)
+            self.release.set()
+            for thread in threads:
+                thread.join()
+
+        assert get.call_count == 1
+        assert results == [[{"number": 1}]] * 3
+        assert client.in_flight.stats["hits"] >= 2
+
+    def test_errors_are_shared_and_not_remembered(self, github_headers):
+        """Test if a failed flight raises for its callers and the next call retries"""
+        flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            flight.do("key", fail)
+        assert flight.do("key", lambda: "ok") == "ok"
+        assert flight.stats["flights"] == 2
+
+
+class TestRateLimiter(SimpleTestCase):
+
+    def budget_headers(self, remaining, limit=5000, reset_in=600):
+        return {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(time.time()) + reset_in),
+        }
+
+    @mock.patch("github_service.ratelimit.time.sleep")
+    def test_low_budget_slows_only_background_calls(self, sleep):
+        """Test if non-urgent calls are spaced out once the budget runs low"""
+        limiter = RateLimiter(slowdown_threshold=0.2, max_wait=10)
+        key = ("token", "core")
+        limiter.update(key, github_response(200, headers=self.budget_headers(100)))
+        limiter.wait(key, urgent=True)
+        sleep.assert_not_called()
+        limiter.wait(key, urgent=False)
+        assert 5 < sleep.call_args.args[0] <= 6
+        assert limiter.status()["budgets"]["token:core"]["remaining"] == 100
+
+    def test_exhausted_budget_fails_fast(self):
+        """Test if waiting beyond max_wait raises instead of blocking the page"""
+        limiter = RateLimiter(max_wait=10)
+        key = ("token", "core")
+        limiter.update(key, github_response(200, headers=self.budget_headers(0)))
+        with self.assertRaises(GitHubRateLimitError):
+            limiter.wait(key, urgent=True)
+
+    def test_resources_have_separate_budgets(self):
+        """Test if an exhausted search budget leaves core calls alone"""
+        limiter = RateLimiter(max_wait=10)
+        search = limiter.key_for({}, "https://api.github.com/search/issues?q=x")
+        core = limiter.key_for({}, "https://api.github.com/repos/codaqui/tutor")
+        assert search[1] == "search" and core[1] == "core"
+        headers = {**self.budget_headers(0, limit=30), "X-RateLimit-Resource": "search"}
+        # Recorded under the resource GitHub reports, not the URL guess.
+        limiter.update(core, github_response(200, headers=headers))
+        limiter.wait(core, urgent=True)
+        with self.assertRaises(GitHubRateLimitError):
+            limiter.wait(search, urgent=True)
+
+    # A fresh limiter keeps the block from leaking into later tests.
+    @mock.patch.object(client, "rate_limiter", RateLimiter())
+    @mock.patch("github_service.ratelimit.time.sleep")
+    @mock.patch("github_service.client.session.request")
+    def test_retry_after_is_honoured(self, request, sleep):
+        """Test if a secondary rate limit is retried after Retry-After"""
+        request.side_effect = [
+            github_response(403, headers={"Retry-After": "2"}),
+            github_response(200, {"ok": True}),
+        ]
+        response = client.request("GET", "https://api.github.com/app", headers={})
+        assert response.status_code == 200
+        assert 2 <= sleep.call_args.args[0] <= 2.5
+        assert request.call_count == 2
+
+    @mock.patch("github_service.client.session.request")
+    def test_permission_errors_are_not_retried(self, request):
+        """Test if a plain 403 is returned without retrying"""
+        request.return_value = github_response(403, {"message": "Forbidden"})
+        response = client.request("GET", "https://api.github.com/app", headers={})
+        assert response.status_code == 403
+        assert request.call_count == 1
+
+
+def page_response(items, links=None):
+    return CachedResponse(data=items, links=links or {})
+
+
+class TestPaginate(SimpleTestCase):
+    url = "https://api.github.com/repos/codaqui/tutor/issues"
+
+    def link(self, page):
+        return {"url": f"{self.url}?per_page=100&page={page}"}
+
+    def test_remaining_pages_fetched_after_first(self):
+        """Test if every page up to rel=last is fetched and yielded in order"""
+        pages = {
+            2: page_response([3, 4]),
+            3: page_response([5]),
+        }
+        first = page_response([1, 2], {"next": self.link(2), "last": self.link(3)})
+        with mock.patch("github_service.client.get_response") as get_response:
+            get_response.side_effect = lambda url, params, urgent, project: (
+                pages[params["page"]] if "page" in params else first
+            )
+            assert list(client.paginate(self.url)) == [1, 2, 3, 4, 5]
+        assert get_response.call_args_list[0].args[1]["per_page"] == 100
+
+    def test_max_items_limits_pages_fetched(self):
+        """Test if the cap stops iteration and skips pages beyond it"""
+        first = page_response(list(range(100)), {"last": self.link(5)})
+        with mock.patch("github_service.client.get_response") as get_response:
+            get_response.side_effect = lambda url, params, urgent, project: (
+                page_response(list(range(100))) if "page" in params else first
+            )
+            items = list(client.paginate(self.url, max_items=150))
+        assert len(items) == 150
+        assert get_response.call_count == 2
+
+    def test_follows_next_links_without_last(self):
+        """Test if endpoints without rel=last are walked through rel=next"""
+        responses = [
+            page_response([1], {"next": self.link(2)}),
+            page_response([2]),
+        ]
+        with mock.patch("github_service.client.get_response") as get_response:
+            get_response.side_effect = lambda *args, **kwargs: responses.pop(0)
+            assert list(client.paginate(self.url)) == [1, 2]
+
+
+def issue_payload(number=1, updated_at="2024-06-01T10:00:00Z", **extra):
+    return {
+        "id": 1000 + number,
+        "number": number,
+        "title": f"Issue {number}",
+        "body": "Body",
+        "state": "open",
+        "html_url": f"https://github.com/codaqui/tutor/issues/{number}",
+        "user": {"login": "author"},
+        "assignee": None,
+        "labels": [{"name": "good first issue"}],
+        "comments": 0,
+        "created_at": "2024-06-01T09:00:00Z",
+        "updated_at": updated_at,
+        "closed_at": None,
+        **extra,
+    }
+
+
+@mock.patch("github_service.webhooks.GH_WEBHOOK_SECRET", "secret")
+class TestGitHubWebhook(TestCase):
+
+    def deliver(self, event, payload, secret="secret"):
+        body = json.dumps(payload).encode()
+        signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            reverse("github_service:webhook"),
+            data=body,
+            content_type="application/json",
+            headers={
+                "X-GitHub-Event": event,
+                "X-Hub-Signature-256": f"sha256={signature}",
+            },
+        )
+
+    def test_invalid_signature_is_rejected(self):
+        """Test if deliveries signed with another secret are refused"""
+        response = self.deliver(
+            "issues",
+            {"action": "opened", "issue": issue_payload()},
+            secret="wrong",
+        )
+        assert response.status_code == 401
+        assert not Issue.objects.exists()
+
+    def test_issue_and_comment_are_upserted(self):
+        """Test if issue and comment events are mirrored locally"""
+        repository = {"full_name": "codaqui/tutor"}
+        self.deliver(
+            "issues",
+            {"action": "opened", "issue": issue_payload(), "repository": repository},
+        )
+        comment = {
+            "id": 7,
+            "user": {"login": "student"},
+            "body": "Posso ajudar?",
+            "html_url": "https://github.com/codaqui/tutor/issues/1#issuecomment-7",
+            "created_at": "2024-06-01T11:00:00Z",
+            "updated_at": "2024-06-01T11:00:00Z",
+        }
+        response = self.deliver(
+            "issue_comment",
+            {
+                "action": "created",
+                "issue": issue_payload(updated_at="2024-06-01T11:00:00Z"),
+                "comment": comment,
+                "repository": repository,
+            },
+        )
+        assert response.status_code == 204
+        issue = Issue.objects.get(number=1)
+        assert issue.labels == ["good first issue"]
+        assert IssueComment.objects.get(issue=issue).user_login == "student"
+
+    def test_out_of_order_delivery_is_ignored(self):
+        """Test if an older payload does not overwrite a newer mirrored issue"""
+        repository = {"full_name": "codaqui/tutor"}
+        newer = issue_payload(title="Novo título", updated_at="2024-06-02T10:00:00Z")
+        self.deliver(
+            "issues", {"action": "edited", "issue": newer, "repository": repository}
+        )
+        self.deliver(
+            "issues",
+            {"action": "edited", "issue": issue_payload(), "repository": repository},
+        )
+        assert Issue.objects.get(number=1).title == "Novo título"
+
+
+@mock.patch("github_service.webhooks.GH_WEBHOOK_SECRET", "secret")
+class TestCodaPointsAwards(TestCase):
+
+    def setUp(self):
+        self.student = get_user_model().objects.create_user(username="student")
+        self.student.social_auth.create(provider="github", uid="42")
+        Wallet.objects.create(user=self.student)
+        self.queue = AwardQueue(autostart=False)
+        patcher = mock.patch.object(points, "award_queue", self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def deliver(self, event, payload, delivery="delivery-1"):
+        body = json.dumps(payload).encode()
+        signature = hmac.new(b"secret", body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            reverse("github_service:webhook"),
+            data=body,
+            content_type="application/json",
+            headers={
+                "X-GitHub-Event": event,
+                "X-GitHub-Delivery": delivery,
+                "X-Hub-Signature-256": f"sha256={signature}",
+            },
+        )
+
+    def pull_request(self, action="closed", merged=True):
+        return {
+            "action": action,
+            "pull_request": {
+                "number": 3,
+                "merged": merged,
+                "user": {"id": 42, "login": "student"},
+            },
+            "repository": {"full_name": "codaqui/tutor"},
+        }
+
+    def test_merged_pull_request_is_awarded_once(self):
+        """Test if a merged PR pays its author once, even when redelivered"""
+        self.deliver("pull_request", self.pull_request(), delivery="delivery-1")
+        self.deliver("pull_request", self.pull_request(), delivery="delivery-2")
+        assert len(self.queue) == 2
+        assert self.queue.flush() == 1
+        activity = Activities.objects.get(user=self.student)
+        assert activity.value == 20
+        assert activity.description == "Pull request aceito: codaqui/tutor#3"
+        assert activity.reference == "pull_request_merged:codaqui/tutor#3:42"
+
+    def test_repeated_reviews_pay_once(self):
+        """Test if reviewing the same pull request again earns nothing more"""
+        review = self.pull_request(action="submitted")
+        review["pull_request"]["user"] = {"id": 7, "login": "other"}
+        review["review"] = {"user": {"id": 42, "login": "student"}}
+        self.deliver("pull_request_review", review, delivery="delivery-1")
+        self.deliver("pull_request_review", review, delivery="delivery-2")
+        assert self.queue.flush() == 1
+
+    def test_events_without_points(self):
+        """Test if unmerged PRs, self reviews and dropped issues earn nothing"""
+        self.deliver("pull_request", self.pull_request(merged=False))
+        review = {**self.pull_request(action="submitted")}
+        review["review"] = {"user": {"id": 42, "login": "student"}}
+        self.deliver("pull_request_review", review)
+        issue = issue_payload(
+            state="closed",
+            state_reason="not_planned",
+            assignees=[{"id": 42, "login": "student"}],
+        )
+        self.deliver(
+            "issues",
+            {
+                "action": "closed",
+                "issue": issue,
+                "repository": {"full_name": "codaqui/tutor"},
+            },
+        )
+        assert len(self.queue) == 0
+
+    def test_closed_issue_pays_the_assignees(self):
+        """Test if closing an issue as completed pays its known assignees"""
+        issue = issue_payload(
+            state="closed",
+            state_reason="completed",
+            assignees=[{"id": 42, "login": "student"}, {"id": 7, "login": "other"}],
+        )
+        self.deliver(
+            "issues",
+            {
+                "action": "closed",
+                "issue": issue,
+                "repository": {"full_name": "codaqui/tutor"},
+            },
+        )
+        assert [award.user_id for award in self.queue._pending] == [self.student.id]
+        assert Issue.objects.get(number=1).state == "closed"
+
+    def test_reclosed_issue_pays_once(self):
+        """Test if reopening and closing an issue again earns nothing more"""
+        issue = issue_payload(
+            state="closed", assignees=[{"id": 42, "login": "student"}]
+        )
+        payload = {
+            "action": "closed",
+            "issue": issue,
+            "repository": {"full_name": "codaqui/tutor"},
+        }
+        self.deliver("issues", payload, delivery="delivery-1")
+        self.deliver("issues", {**payload, "action": "reopened"}, delivery="delivery-2")
+        self.deliver("issues", payload, delivery="delivery-3")
+        assert self.queue.flush() == 1
+
+
+class TestMirroredIssueViews(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="student")
+        self.client.force_login(user)
+        RepositorySync.objects.create(
+            repository=DEFAULT_REPOSITORY, synced_at=timezone.now()
+        )
+        upsert_issue(issue_payload(1))
+        upsert_issue(issue_payload(2, state="closed"))
+
+    @mock.patch("github_service.client.session.request")
+    def test_issue_list_reads_mirror(self, get):
+        """Test if the issue board is served from the database only"""
+        response = self.client.get(reverse("github_service:list_issues"))
+        assert response.status_code == 200
+        assert [issue.number for issue in response.context["issues"]] == [1]
+        get.assert_not_called()
+
+    @mock.patch("github_service.client.session.request")
+    def test_issue_view_reads_mirror(self, get):
+        """Test if an issue page is served from the database only"""
+        response = self.client.get(
+            reverse("github_service:issue_controller", args=[1, "view"])
+        )
+        assert response.status_code == 200
+        assert response.context["issue"].title == "Issue 1"
+        get.assert_not_called()
+
+
+def graphql_issue_payload(number=1, has_next_page=False):
+    return {
+        "data": {
+            "repository": {
+                "issue": {
+                    "databaseId": 1000 + number,
+                    "number": number,
+                    "title": f"Issue {number}",
+                    "body": "Body",
+                    "state": "OPEN",
+                    "url": f"https://github.com/codaqui/tutor/issues/{number}",
+                    "createdAt": "2024-06-01T09:00:00Z",
+                    "updatedAt": "2024-06-01T10:00:00Z",
+                    "closedAt": None,
+                    "author": {"login": "author"},
+                    "assignees": {"nodes": [{"login": "student"}]},
+                    "labels": {"nodes": [{"name": "bug"}]},
+                    "comments": {
+                        "totalCount": 1,
+                        "pageInfo": {
+                            "hasNextPage": has_next_page,
+                            "endCursor": "cursor-1",
+                        },
+                        "nodes": [
+                            {
+                                "databaseId": 7,
+                                "body": "Posso ajudar?",
+                                "url": "https://github.com/codaqui/tutor/issues/1#issuecomment-7",
+                                "createdAt": "2024-06-01T11:00:00Z",
+                                "updatedAt": "2024-06-01T11:00:00Z",
+                                "author": {"login": "student"},
+                            }
+                        ],
+                    },
+                }
+            }
+        }
+    }
+
+
+@mock.patch("github_service.client.github_headers", side_effect=dict)
+@mock.patch("github_service.client.session.request")
+class TestGraphQLIssuePages(TestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="student")
+        self.client.force_login(user)
+
+    def test_comments_page_is_one_round_trip(self, request, github_headers):
+        """Test if issue and comments come from a single GraphQL query"""
+        request.return_value = github_response(
+            200, graphql_issue_payload(has_next_page=True)
+        )
+        response = self.client.get(
+            reverse("github_service:issue_comments_controller", args=[1])
+        )
+        assert response.status_code == 200
+        assert [c.user_login for c in response.context["comments"]] == ["student"]
+        assert response.context["next_cursor"] == "cursor-1"
+        assert request.call_count == 1
+        assert request.call_args.args[0] == "POST"
+
+    def test_mirrored_miss_stores_issue_and_comments(self, request, github_headers):
+        """Test if a mirrored repository keeps the issue fetched through GraphQL"""
+        RepositorySync.objects.create(
+            repository=DEFAULT_REPOSITORY, synced_at=timezone.now()
+        )
+        request.return_value = github_response(200, graphql_issue_payload())
+        response = self.client.get(
+            reverse("github_service:issue_controller", args=[1, "view"])
+        )
+        assert response.status_code == 200
+        issue = Issue.objects.get(number=1)
+        assert issue.assignee_login == "student"
+        assert issue.comments.count() == 1
+
+    def test_error_answer_is_not_a_missing_issue(self, request, github_headers):
+        """Test if a failed GraphQL call raises instead of reading as a 404"""
+        request.return_value = github_response(502, {"message": "Bad Gateway"})
+        with self.assertRaises(GitHubGraphQLError):
+            fetch_issue_thread(1)
+
+    def test_issue_gone_during_comment_walk(self, request, github_headers):
+        """Test if an issue deleted between comment pages answers 404"""
+        RepositorySync.objects.create(
+            repository=DEFAULT_REPOSITORY, synced_at=timezone.now()
+        )
+        request.side_effect = [
+            github_response(200, graphql_issue_payload(has_next_page=True)),
+            github_response(200, {"data": {"repository": {"issue": None}}}),
+        ]
+        response = self.client.get(
+            reverse("github_service:issue_controller", args=[1, "view"])
+        )
+        assert response.status_code == 404
+        assert not Issue.objects.exists()
+
+
+class TestMarkdownRendering(SimpleTestCase):
+
+    def setUp(self):
+        render_cache.clear()
+
+    def test_markdown_is_rendered_and_sanitized(self):
+        """Test if Markdown becomes HTML while raw HTML and unsafe links stay text"""
+        html = render_markdown(
+            "# Tarefa\n**Leia** [o guia](https://codaqui.dev)\n"
+            "<script>alert(1)</script> [x](javascript:alert(1))\n\n- [x] feito"
+        )
+        assert "<h1>Tarefa</h1>" in html
+        assert "<strong>Leia</strong>" in html
+        link = '<a href="https://codaqui.dev" rel="nofollow noopener">o guia</a>'
+        assert link in html
+        assert "&lt;script&gt;" in html
+        assert 'href="javascript' not in html
+        assert '<input type="checkbox" disabled checked> feito' in html
+
+    def test_unmatched_emphasis_stays_text(self):
+        """Test if delimiters without a closing pair are left as typed"""
+        html = render_markdown("**a " * 2000 + "**b *c* d** _e ~~f")
+        assert html.count("<strong>") == 1
+        assert "<strong>b <em>c</em> d</strong>" in html
+        assert "_e ~~f" in html
+
+    def test_unclosed_links_render_in_linear_time(self):
+        """Test if a 64 KB body of unclosed links and images renders quickly"""
+        for body in ("[a](http://" * 5900, "![a](http://" * 5400):
+            started = time.perf_counter()
+            html = render_markdown(body)
+            assert time.perf_counter() - started < 1
+            assert "<img" not in html
+
+    def test_deeply_nested_quote_is_capped(self):
+        """Test if thousands of > markers render without recursing per level"""
+        html = render_markdown("> " * 1000 + "fim")
+        assert html.count("<blockquote>") == 8
+        assert html.endswith("fim</p>" + "</blockquote>" * 8)
+
+    @mock.patch("github_service.rendering.render_markdown", side_effect=render_markdown)
+    def test_rendered_body_cached_per_version(self, render):
+        """Test if a body is rendered once per updated_at"""
+        issue = Issue(github_id=1, body="*v1*", updated_at=timezone.now())
+        assert render_body(issue) == "<p><em>v1</em></p>"
+        assert render_body(issue) == "<p><em>v1</em></p>"
+        assert render.call_count == 1
+
+        issue.body = "*v2*"
+        issue.updated_at += timedelta(minutes=1)
+        assert render_body(issue) == "<p><em>v2</em></p>"
+        assert render.call_count == 2
+
+    def test_preview_is_truncated_with_tags_closed(self):
+        """Test if previews keep only the first words of the rendered body"""
+        issue = Issue(
+            github_id=1, body="**um dois tres** quatro", updated_at=timezone.now()
+        )
+        preview = render_preview(issue, words=2)
+        assert "dois…" in preview and "tres" not in preview
+        assert preview.endswith("</strong></p>")
+
+
+class TestIssueBoard(TestCase):
+
+    def setUp(self):
+        RepositorySync.objects.create(
+            repository="codaqui/tutor", synced_at=timezone.now()
+        )
+        upsert_issue(issue_payload(1, updated_at="2024-06-01T10:00:00Z"))
+        upsert_issue(issue_payload(2, updated_at="2024-06-03T10:00:00Z"))
+
+    def live_issues(self, repository):
+        if repository == "codaqui/quebrado":
+            raise ValueError("Not Found")
+        return [
+            Issue(**issue_fields(issue_payload(9, updated_at=updated_at), repository))
+            for updated_at in ("2024-06-04T10:00:00Z", "2024-06-02T10:00:00Z")
+        ]
+
+    @mock.patch("github_service.aio.fetch_open_issues")
+    def test_repositories_are_merged_by_update_time(self, fetch_open_issues):
+        """Test if mirrored and live repositories become one sorted stream"""
+        fetch_open_issues.side_effect = self.live_issues
+        self.client.force_login(
+            get_user_model().objects.create_user(username="student")
+        )
+        with mock.patch(
+            "github_service.board.GITHUB_BOARD_REPOSITORIES",
+            ["tutor", "site", "quebrado"],
+        ):
+            response = self.client.get(reverse("github_service:list_issues"))
+
+        assert [(i.repository, i.number) for i in response.context["issues"]] == [
+            ("codaqui/site", 9),
+            ("codaqui/tutor", 2),
+            ("codaqui/site", 9),
+            ("codaqui/tutor", 1),
+        ]
+        assert list(response.context["failures"]) == ["codaqui/quebrado"]
+        assert fetch_open_issues.call_count == 2
+
+    @mock.patch("github_service.aio.fetch_open_issues")
+    def test_async_board_fetches_repositories_concurrently(self, fetch_open_issues):
+        """Test if the async board requests every live repository at once"""
+        both_started = threading.Barrier(2, timeout=5)
+
+        def fetch(repository):
+            both_started.wait()
+            return self.live_issues(repository)
+
+        fetch_open_issues.side_effect = fetch
+        user = get_user_model().objects.create_user(username="student")
+        self.client.force_login(user)
+        with mock.patch(
+            "github_service.board.GITHUB_BOARD_REPOSITORIES",
+            ["tutor", "site", "bot"],
+        ):
+            response = self.client.get(reverse("github_service:list_issues"))
+
+        assert response.status_code == 200
+        assert len(response.context["issues"]) == 6
+        assert response.context["failures"] == {}
+
+    @mock.patch("github_service.client.github_headers", side_effect=dict)
+    @mock.patch("github_service.client.session.request")
+    def test_unavailable_repository_is_left_out(self, request, github_headers):
+        """Test if a GitHub error answer fails only its repository"""
+        client.response_cache.clear()
+
+        def answer(method, url, **kwargs):
+            if "/repos/codaqui/renomeado/" in url:
+                response = github_response(404, {"message": "Not Found"})
+            else:
+                response = github_response(200, [issue_payload(9)])
+            response.links = {}
+            return response
+
+        request.side_effect = answer
+        self.client.force_login(
+            get_user_model().objects.create_user(username="student")
+        )
+        with mock.patch(
+            "github_service.board.GITHUB_BOARD_REPOSITORIES",
+            ["tutor", "site", "renomeado"],
+        ):
+            response = self.client.get(reverse("github_service:list_issues"))
+
+        assert response.status_code == 200
+        assert list(response.context["failures"]) == ["codaqui/renomeado"]
+        assert [issue.repository for issue in response.context["issues"]] == [
+            "codaqui/tutor",
+            "codaqui/tutor",
+            "codaqui/site",
+        ]
+
+    def test_anonymous_user_is_redirected_to_login(self):
+        """Test if the async issue pages still require a logged in user"""
+        response = self.client.get(reverse("github_service:list_issues"))
+        assert response.status_code == 302
+
+    @mock.patch("github_service.board.GITHUB_BOARD_TOPIC", "intranet")
+    @mock.patch("github_service.board.get_json")
+    def test_board_repositories_from_topic(self, get_json):
+        """Test if a topic resolves to the organization repositories tagged with it"""
+        get_json.return_value = {
+            "items": [{"full_name": "codaqui/site"}, {"full_name": "codaqui/bot"}]
+        }
+        assert board_repositories() == ["codaqui/bot", "codaqui/site"]
+        assert "topic:intranet" in get_json.call_args.args[1]["q"]
+
+
+def comment_payload(comment_id, body, updated_at="2024-06-01T11:00:00Z"):
+    return {
+        "id": comment_id,
+        "user": {"login": "student"},
+        "body": body,
+        "html_url": f"https://github.com/codaqui/tutor/issues/1#issuecomment-{comment_id}",
+        "created_at": "2024-06-01T11:00:00Z",
+        "updated_at": updated_at,
+    }
+
+
+@skipUnless(connection.vendor == "postgresql", "Full-text search needs PostgreSQL")
+class TestIssueSearch(TestCase):
+
+    def setUp(self):
+        self.first = upsert_issue(
+            issue_payload(1, title="Criar página de eventos", body="Usar Django")
+        )
+        self.second = upsert_issue(
+            issue_payload(2, title="Corrigir login", body="Eventos não aparecem")
+        )
+
+    def test_title_matches_rank_first(self):
+        """Test if a title hit outranks a body hit, with Portuguese stemming"""
+        assert update_search_index() == 2
+        results = list(search_issues("evento"))
+        assert [issue.number for issue in results] == [1, 2]
+
+    def test_only_changed_issues_are_reindexed(self):
+        """Test if indexing is incremental and picks up new comments"""
+        update_search_index()
+        assert update_search_index() == 0
+
+        upsert_comment(
+            comment_payload(
+                7, "Precisa de testes automatizados", "2024-06-02T10:00:00Z"
+            ),
+            self.second,
+        )
+        assert update_search_index() == 1
+        assert [issue.number for issue in search_issues("automatizado")] == [2]
+
+
+class TestIssueSearchView(TestCase):
+
+    def test_empty_query_renders_form(self):
+        """Test if the search page renders without a query or a GitHub call"""
+        user = get_user_model().objects.create_user(username="student")
+        self.client.force_login(user)
+        with mock.patch("github_service.client.session.request") as request:
+            response = self.client.get(reverse("github_service:search_issues"))
+        assert response.status_code == 200
+        assert response.context["page"] is None
+        request.assert_not_called()
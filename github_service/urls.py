@@ -20,15 +20,18 @@ from django.urls import path
 
 from github_service.apps import GithubServiceConfig
 from github_service.views import (
+    github_webhook,
     view_issue_controller,
     view_issue_list,
     view_issue_comment_controller,
+    view_issue_search,
 )
 
 app_name = GithubServiceConfig.name
 
 urlpatterns = [
     path("list-issues/", view_issue_list, name="list_issues"),
+    path("search/", view_issue_search, name="search_issues"),
     path(
         "issue/<int:issue_number>/<str:action>/",
         view_issue_controller,
@@ -39,4 +42,5 @@ urlpatterns = [
         view_issue_comment_controller,
         name="issue_comments_controller",
     ),
+    path("webhook/", github_webhook, name="webhook"),
 ]
@@ -1,21 +1,39 @@
+import asyncio
+import json
 import logging
 
 import pytest
-import requests
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import HttpResponse
 from django.shortcuts import redirect, render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from codaqui.settings import GITHUB_ORGANIZATION, GITHUB_REPOSITORY
 
-from github_service.auth import generate_access_token, generate_jwt_from_app
+from github_service.aio import (
+    aload_board,
+    aload_comments,
+    aload_issue,
+    ais_mirrored,
+    alogin_required,
+    run,
+)
+from github_service.auth import generate_jwt_from_app, token_provider
+from github_service import client
+from github_service.client import get_json, paginate
+from github_service.rendering import attach_rendered_bodies
+from github_service.search import search_issues
+from github_service.sync import DEFAULT_REPOSITORY, upsert_comment, upsert_issue
+from github_service.webhooks import handle_event, verify_signature
 from users.models import User
 
+SEARCH_PAGE_SIZE = 20
 
-def github_headers():
-    access_token = generate_access_token()
-    return {
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/vnd.github+json",
-    }
+# Templates read the lazy request.user (and its social auth data), which
+# needs the synchronous ORM.
+arender = sync_to_async(render)
 
 
 def github_user_headers(user: User):
@@ -47,7 +65,7 @@ def github_who_am_i():
     """
     url = f"https://api.github.com/app"
     headers = github_headers_with_json()
-    response = requests.get(url, headers=headers)
+    response = client.request("GET", url, headers=headers)
     return response.json()
 
 
@@ -60,11 +78,25 @@ def invite_user_to_github_team(github_username: str):
     """
     logging.info(f"Inviting {github_username} to the GitHub Team")
     url = f"https://api.github.com/orgs/{GITHUB_ORGANIZATION}/teams/intranet/memberships/{github_username}"
-    headers = github_headers()
-    response = requests.put(url, headers=headers)
+    response = client.request("PUT", url)
     return response
 
 
+def get_membership_state(github_username: str) -> str:
+    """
+    Retrieves the state of a user's membership in the GitHub Team.
+
+    Args:
+        github_username (str): The GitHub username.
+
+    Returns:
+        str: "active", "pending" or "none" when the user is not in the team.
+    """
+    url = f"https://api.github.com/orgs/{GITHUB_ORGANIZATION}/teams/intranet/memberships/{github_username}"
+    response = client.request("GET", url)
+    return response.json()["state"] if response.status_code == 200 else "none"
+
+
 def verify_membership(github_username: str) -> bool:
     """
     Verifies if a user is a member of the GitHub Team.
@@ -75,29 +107,42 @@ def verify_membership(github_username: str) -> bool:
     Returns:
         bool: True if the user is a member of the GitHub Team, False otherwise.
     """
-    url = f"https://api.github.com/orgs/{GITHUB_ORGANIZATION}/teams/intranet/memberships/{github_username}"
-    headers = github_headers()
-    response = requests.get(url, headers=headers)
-    return (
-        True
-        if response.status_code == 200 and response.json()["state"] == "active"
-        else False
-    )
+    return get_membership_state(github_username) == "active"
+
+
+def list_team_membership_states() -> dict:
+    """
+    Lists every member and pending invitation of the GitHub Team, walking the
+    paginated endpoints instead of asking for each user separately.
 
+    Returns:
+        dict: Lowercased GitHub usernames mapped to "active" or "pending".
+    """
+    url = f"https://api.github.com/orgs/{GITHUB_ORGANIZATION}/teams/intranet"
+    states = {
+        invitation["login"].lower(): "pending"
+        for invitation in paginate(f"{url}/invitations", urgent=False)
+        if invitation.get("login")
+    }
+    for member in paginate(f"{url}/members", urgent=False):
+        states[member["login"].lower()] = "active"
+    return states
 
-def list_issues() -> list:
+
+def list_issues(max_items: int = None) -> list:
     """
     List all issues in the GitHub repository.
 
+    Args:
+        max_items (int): Optional cap on the number of issues returned.
+
     Returns:
         list: A list of dictionaries containing information about the issues.
     """
     url = (
         f"https://api.github.com/repos/{GITHUB_ORGANIZATION}/{GITHUB_REPOSITORY}/issues"
     )
-    headers = github_headers()
-    response = requests.get(url, headers=headers)
-    return response.json()
+    return list(paginate(url, max_items=max_items))
 
 
 def get_issue(issue_number: int):
@@ -111,9 +156,7 @@ def get_issue(issue_number: int):
         dict: A dictionary containing information about the issue.
     """
     url = f"https://api.github.com/repos/{GITHUB_ORGANIZATION}/{GITHUB_REPOSITORY}/issues/{issue_number}"
-    headers = github_headers()
-    response = requests.get(url, headers=headers)
-    return response.json()
+    return get_json(url)
 
 
 def assign_user_issue(issue_number: int, assignee: str):
@@ -127,91 +170,128 @@ def assign_user_issue(issue_number: int, assignee: str):
         assignee (str): The GitHub username of the assignee.
     """
     url = f"https://api.github.com/repos/{GITHUB_ORGANIZATION}/{GITHUB_REPOSITORY}/issues/{issue_number}"
-    headers = github_headers()
     data = {"assignees": [assignee]}
-    response = requests.patch(url, headers=headers, json=data)
+    response = client.request("PATCH", url, json=data)
     return response
 
 
-def list_comments(issue_number: int) -> list:
+def list_comments(issue_number: int, max_items: int = None) -> list:
     """
     List all comments on an issue.
 
     Args:
         issue_number (int): The issue number.
+        max_items (int): Optional cap on the number of comments returned.
 
     Returns:
         list: A list of dictionaries containing information about the comments.
     """
     url = f"https://api.github.com/repos/{GITHUB_ORGANIZATION}/{GITHUB_REPOSITORY}/issues/{issue_number}/comments"
-    headers = github_headers()
-    response = requests.get(url, headers=headers)
-    return response.json()
+    return list(paginate(url, max_items=max_items))
 
 
-def create_comment(issue_number: int, comment: str, user: User):
+def create_comment(
+    issue_number: int, comment: str, user: User = None, headers: dict = None
+):
     """
     Creates a comment on an issue.
 
     Args:
         issue_number (int): The issue number.
         comment (str): The comment text.
+        user (User): The author, whose GitHub token is used.
+        headers (dict): The author's headers from :func:`github_user_headers`,
+            already built, in place of ``user``.
     """
     url = f"https://api.github.com/repos/{GITHUB_ORGANIZATION}/{GITHUB_REPOSITORY}/issues/{issue_number}/comments"
-    headers = github_user_headers(user)
+    headers = headers if headers is not None else github_user_headers(user)
     data = {"body": comment}
-    response = requests.post(url, headers=headers, json=data)
+    response = client.request("POST", url, headers=headers, json=data)
     return response
 
 
-@login_required
-def view_issue_controller(request, issue_number, action):
+@csrf_exempt
+@require_POST
+def github_webhook(request):
+    signature = request.headers.get("X-Hub-Signature-256", "")
+    if not verify_signature(request.body, signature):
+        return HttpResponse(status=401)
+    handle_event(request.headers.get("X-GitHub-Event"), json.loads(request.body))
+    return HttpResponse(status=204)
+
+
+@alogin_required
+async def view_issue_controller(request, issue_number, action):
     valid_actions = ["view", "auto_assigne"]
     if action == "view":
-        issue = get_issue(issue_number)
-        logging.info(f"Found issue: {issue}")
-        logging.info(f"Issue Fields: {issue.keys()}")
-        return render(request, "github_service/view_issue.html", {"issue": issue})
+        issue = await aload_issue(issue_number)
+        await run(attach_rendered_bodies, [issue])
+        return await arender(
+            request, "github_service/view_issue.html", {"issue": issue}
+        )
     elif action == "auto_assigne":
         user_action: User = request.user
-        assignee = user_action.get_github_username()
-        response = assign_user_issue(issue_number, assignee)
+        # The installation token is minted while the username is looked up.
+        assignee, _ = await asyncio.gather(
+            sync_to_async(user_action.get_github_username)(),
+            run(token_provider.get_access_token),
+        )
+        response, mirrored = await asyncio.gather(
+            run(assign_user_issue, issue_number, assignee), ais_mirrored()
+        )
         if response.status_code == 200:
+            if mirrored:
+                await sync_to_async(upsert_issue)(response.json())
             return redirect("github_service:issue_controller", issue_number, "view")
         else:
             logging.error(f"Error assigning issue #{issue_number} to {assignee}")
             logging.error(f"Response: {response.json()}")
             message = f"Failed to assign issue #{issue_number} to {assignee}!"
             error_code = 500
-            return render(
+            return await arender(
                 request, "utils/error.html", {"message": message}, status=error_code
             )
     else:
         message = f"Invalid action: {action}, valid actions are: {valid_actions}!"
         error_code = 400
-        return render(
+        return await arender(
             request, "utils/error.html", {"message": message}, status=error_code
         )
 
 
-@login_required
-def view_issue_list(request):
-    issues = list_issues()
-    issues_len = len(issues)
-    logging.info(f"Found {len(issues)} issues")
-    if issues_len > 0:
-        logging.info(f"Issues Keys: {issues[0].keys()}")
-    else:
-        logging.info("No issues found")
-    return render(request, "github_service/list_issues.html", {"issues": issues})
+@alogin_required
+async def view_issue_list(request):
+    board = await aload_board()
+    issues = await run(attach_rendered_bodies, board.issues, preview=True)
+    logging.info(
+        f"Found {len(issues)} issues in {len(board.repositories)} repositories"
+    )
+    return await arender(
+        request,
+        "github_service/list_issues.html",
+        {
+            "issues": issues,
+            "repositories": board.repositories,
+            "failures": board.failures,
+            "default_repository": DEFAULT_REPOSITORY,
+        },
+    )
 
 
-@login_required
-def view_issue_comment_controller(request, issue_number):
+@alogin_required
+async def view_issue_comment_controller(request, issue_number):
     if request.method == "POST":
         comment = request.POST.get("comment")
-        response = create_comment(issue_number, comment, request.user)
+        user = request.user
+        headers = await sync_to_async(github_user_headers)(user)
+        response, mirrored = await asyncio.gather(
+            run(create_comment, issue_number, comment, headers=headers),
+            ais_mirrored(),
+        )
         if response.status_code == 201:
+            if mirrored:
+                issue = await aload_issue(issue_number)
+                await sync_to_async(upsert_comment)(response.json(), issue)
             return redirect(
                 "github_service:issue_comments_controller", issue_number=issue_number
             )
@@ -220,13 +300,37 @@ def view_issue_comment_controller(request, issue_number):
             logging.error(f"Response: {response.json()}")
             message = f"Failed to create comment on issue #{issue_number}!"
             error_code = 500
-            return render(
+            return await arender(
                 request, "utils/error.html", {"message": message}, status=error_code
             )
 
-    comments = list_comments(issue_number)
-    return render(
+    comments, next_cursor = await aload_comments(issue_number, request.GET.get("after"))
+    await run(attach_rendered_bodies, comments)
+    return await arender(
         request,
         "github_service/comments_issue.html",
-        {"comments": comments, "issue_number": issue_number},
+        {
+            "comments": comments,
+            "issue_number": issue_number,
+            "next_cursor": next_cursor,
+        },
+    )
+
+
+@login_required
+def view_issue_search(request):
+    query = request.GET.get("q", "").strip()
+    page = None
+    if query:
+        paginator = Paginator(search_issues(query), SEARCH_PAGE_SIZE)
+        page = paginator.get_page(request.GET.get("page"))
+        attach_rendered_bodies(page.object_list, preview=True)
+    return render(
+        request,
+        "github_service/search_issues.html",
+        {
+            "query": query,
+            "page": page,
+            "default_repository": DEFAULT_REPOSITORY,
+        },
     )
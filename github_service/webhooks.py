@@ -0,0 +1,67 @@
+import hashlib
+import hmac
+import logging
+
+from codaqui.settings import GH_WEBHOOK_SECRET
+from github_service.models import Issue, IssueComment
+from github_service.points import queue_awards
+from github_service.sync import is_pull_request, upsert_comment, upsert_issue
+
+
+def verify_signature(body: bytes, signature: str) -> bool:
+    """
+    Validates the ``X-Hub-Signature-256`` header of a webhook delivery.
+
+    Args:
+        body (bytes): The raw request body.
+        signature (str): The header value, ``sha256=<hexdigest>``.
+
+    Returns:
+        bool: True if the payload was signed with our webhook secret.
+    """
+    if not GH_WEBHOOK_SECRET or not signature:
+        return False
+    expected = hmac.new(GH_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(f"sha256={expected}", signature)
+
+
+def handle_issues_event(payload: dict):
+    issue = payload["issue"]
+    if is_pull_request(issue):
+        return
+    if payload["action"] in ("deleted", "transferred"):
+        Issue.objects.filter(github_id=issue["id"]).delete()
+    else:
+        upsert_issue(issue, payload["repository"]["full_name"])
+
+
+def handle_issue_comment_event(payload: dict):
+    if is_pull_request(payload["issue"]):
+        return
+    if payload["action"] == "deleted":
+        IssueComment.objects.filter(github_id=payload["comment"]["id"]).delete()
+    else:
+        issue = upsert_issue(payload["issue"], payload["repository"]["full_name"])
+        upsert_comment(payload["comment"], issue)
+
+
+EVENT_HANDLERS = {
+    "issues": handle_issues_event,
+    "issue_comment": handle_issue_comment_event,
+}
+
+
+def handle_event(event: str, payload: dict):
+    """
+    Applies a verified webhook delivery to the local mirror and queues the
+    CodaPoints it earns.
+
+    Args:
+        event (str): The ``X-GitHub-Event`` header.
+        payload (dict): The decoded delivery body.
+    """
+    handler = EVENT_HANDLERS.get(event)
+    if handler is not None:
+        handler(payload)
+    if not queue_awards(event, payload) and handler is None:
+        logging.info(f"Ignoring GitHub webhook event: {event}")
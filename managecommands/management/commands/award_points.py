@@ -0,0 +1,59 @@
+# Dá CodaPoints para vários usuários de uma vez (ex: toda a turma de uma aula).
+# Todas as atividades são criadas e os saldos atualizados em uma única
+# transação: se algum usuário não tiver carteira, ninguém recebe os pontos.
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from student.models import Student
+from wallet.models import Wallet, award_points
+
+
+class Command(BaseCommand):
+    help = "Dá a mesma quantidade de CodaPoints para vários usuários."
+
+    def add_arguments(self, parser):
+        parser.add_argument("value", type=Decimal, help="Quantidade de CodaPoints")
+        parser.add_argument("description", type=str, help="Descrição da atividade")
+        parser.add_argument(
+            "--users",
+            "-u",
+            nargs="+",
+            default=[],
+            help="Usernames que recebem os pontos",
+        )
+        parser.add_argument(
+            "--active-students",
+            action="store_true",
+            help="Dá os pontos para todos os alunos ativos",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = set(
+            get_user_model()
+            .objects.filter(username__in=options["users"])
+            .values_list("id", flat=True)
+        )
+        if options["active_students"]:
+            user_ids.update(
+                Student.objects.filter(is_active=True).values_list("user_id", flat=True)
+            )
+        if not user_ids:
+            raise CommandError(
+                "Nenhum usuário encontrado. Use --users ou --active-students."
+            )
+
+        self.stdout.write(
+            f"🪙 Dando {options['value']} CodaPoints para {len(user_ids)} usuários..."
+        )
+        try:
+            activities = award_points(
+                user_ids, options["value"], options["description"]
+            )
+        except (ValueError, Wallet.DoesNotExist) as error:
+            raise CommandError(f"❌ Nenhum ponto foi dado: {error}")
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {len(activities)} usuários receberam CodaPoints.")
+        )
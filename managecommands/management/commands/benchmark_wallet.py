@@ -0,0 +1,91 @@
+# Mede o ledger de CodaPoints sob concorrência: várias threads lançam
+# créditos, débitos, exclusões e transferências nas mesmas carteiras ao mesmo
+# tempo, e ao final o comando confere se os saldos continuam corretos.
+# Rode contra um PostgreSQL de teste antes e depois de mudar o ledger.
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wallet.benchmark import run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Mede vazão, latência e espera por locks do ledger de CodaPoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", "-w", type=int, default=50, help="Threads simultâneas"
+        )
+        parser.add_argument(
+            "--operations", "-n", type=int, default=100, help="Operações por thread"
+        )
+        parser.add_argument(
+            "--users",
+            "-u",
+            type=int,
+            default=10,
+            help="Carteiras disputadas pelas threads",
+        )
+        parser.add_argument(
+            "--balance",
+            type=Decimal,
+            default=Decimal(100),
+            help="Saldo inicial das carteiras",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Semente para repetir a mesma sequência de operações",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Mantém os usuários e atividades criados",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 2:
+            raise CommandError(
+                "São necessários pelo menos 2 usuários para as transferências."
+            )
+
+        self.stdout.write(
+            f"🏋️ {options['workers']} threads x {options['operations']} operações "
+            f"em {options['users']} carteiras..."
+        )
+        result = run_benchmark(
+            workers=options["workers"],
+            operations=options["operations"],
+            users=options["users"],
+            balance=options["balance"],
+            seed=options["seed"],
+            keep=options["keep"],
+        )
+
+        self.stdout.write(
+            f"📊 {result.operations} operações em {result.seconds:.2f}s ({result.throughput:.1f} ops/s)"
+        )
+        self.stdout.write(
+            f"⏱️ Latência p50 {result.p50 * 1000:.1f}ms, p99 {result.p99 * 1000:.1f}ms"
+        )
+        if result.lock_wait is not None:
+            self.stdout.write(
+                f"🔒 Espera por locks: {result.lock_wait:.2f}s somadas entre as conexões"
+            )
+        self.stdout.write(
+            f"🚫 {result.rejected} lançamentos recusados por saldo insuficiente"
+        )
+        for error, count in result.errors.items():
+            self.stdout.write(self.style.WARNING(f"⚠️ {count} erros {error}"))
+
+        if not result.consistent:
+            raise CommandError(
+                f"❌ Ledger inconsistente: saldos divergentes {result.mismatches}, "
+                f"saldos negativos {result.negative}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "✅ Saldos conferem com as atividades e nenhum ficou negativo."
+            )
+        )
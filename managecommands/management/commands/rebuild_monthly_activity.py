@@ -0,0 +1,16 @@
+# Reconstrói o resumo mensal das carteiras a partir de todo o histórico de
+# atividades. Use uma vez após a instalação (backfill) ou se o resumo divergir;
+# no dia a dia ele é atualizado a cada atividade lançada.
+
+from django.core.management.base import BaseCommand
+
+from wallet.models import rebuild_monthly_activity
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o resumo mensal de CodaPoints a partir das atividades."
+
+    def handle(self, *args, **options):
+        self.stdout.write("📅 Reconstruindo o resumo mensal das carteiras...")
+        rows = rebuild_monthly_activity()
+        self.stdout.write(self.style.SUCCESS(f"✅ {rows} meses de alunos gravados."))
@@ -0,0 +1,44 @@
+# Confere se o saldo de cada carteira bate com a soma das suas atividades.
+# Por padrão apenas usuários com movimentação desde a última conferência são
+# verificados, então o comando pode rodar todas as noites (ex: via cron).
+
+from django.core.management.base import BaseCommand
+
+from wallet.reconcile import reconcile
+
+
+class Command(BaseCommand):
+    help = "Confere os saldos das carteiras com a soma das atividades."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Confere todas as carteiras, não apenas as movimentadas",
+        )
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Corrige o saldo das carteiras divergentes",
+        )
+
+    def report(self, mismatch):
+        self.stdout.write(
+            self.style.WARNING(
+                f"⚠️ Usuário {mismatch.user_id}: saldo {mismatch.balance}, "
+                f"atividades somam {mismatch.expected}"
+            )
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🧾 Conferindo os saldos das carteiras...")
+        run = reconcile(full=options["full"], fix=options["fix"], report=self.report)
+        self.stdout.write(
+            f"📊 {run.checked} usuários conferidos, {run.mismatches} divergências."
+        )
+        if run.mismatches and options["fix"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ {run.fixed} carteiras corrigidas.")
+            )
+        elif not run.mismatches:
+            self.stdout.write(self.style.SUCCESS("✅ Todos os saldos conferem."))
@@ -0,0 +1,35 @@
+# Espelha as issues e comentários do repositório no banco local.
+# Deve ser executado uma vez para o bootstrap; depois o webhook do GitHub App
+# (POST /github-service/webhook/) mantém as tabelas atualizadas.
+
+from django.core.management.base import BaseCommand
+
+from github_service.search import update_search_index
+from github_service.sync import DEFAULT_REPOSITORY, resync_repository
+
+
+class Command(BaseCommand):
+    help = "Sincroniza todas as issues e comentários do GitHub com o banco local."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repository",
+            "-r",
+            type=str,
+            help="Repositório no formato org/nome (ex: 'codaqui/tutor')",
+            default=DEFAULT_REPOSITORY,
+        )
+
+    def handle(self, *args, **options):
+        repository = options["repository"]
+        self.stdout.write(f"🔄 Sincronizando issues de {repository}...")
+        issues, comments = resync_repository(repository)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {issues} issues e {comments} comentários sincronizados."
+            )
+        )
+        indexed = update_search_index(repository)
+        self.stdout.write(
+            self.style.SUCCESS(f"🔎 {indexed} issues indexadas para busca.")
+        )
@@ -0,0 +1,16 @@
+# Atualiza o estado de participação no time `intranet` do GitHub para todos
+# os alunos. Pensado para rodar periodicamente (cron), já que as páginas só
+# leem o valor armazenado em Student.github_membership.
+
+from django.core.management.base import BaseCommand
+
+from student.models import sync_github_team_memberships
+
+
+class Command(BaseCommand):
+    help = "Sincroniza o estado de membership do time intranet do GitHub para todos os alunos."
+
+    def handle(self, *args, **options):
+        self.stdout.write("👥 Consultando membros e convites do time intranet...")
+        updated = sync_github_team_memberships()
+        self.stdout.write(self.style.SUCCESS(f"✅ {updated} alunos atualizados."))
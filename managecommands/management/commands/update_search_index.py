@@ -0,0 +1,29 @@
+# Atualiza o índice de busca (full-text) das issues espelhadas.
+# Apenas issues alteradas desde a última indexação são processadas, então o
+# comando pode rodar com frequência (ex: via cron a cada poucos minutos).
+
+from django.core.management.base import BaseCommand
+
+from github_service.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = "Atualiza o índice de busca das issues e comentários espelhados."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repository",
+            "-r",
+            type=str,
+            help="Limita a um repositório no formato org/nome (ex: 'codaqui/tutor')",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Reindexa todas as issues, não apenas as alteradas",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔎 Atualizando o índice de busca...")
+        indexed = update_search_index(options["repository"], full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"✅ {indexed} issues indexadas."))
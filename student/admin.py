@@ -1,22 +1,53 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-from student.models import Student
+from student.models import (
+    Student,
+    bulk_activate_students,
+    bulk_invite_students,
+    sync_github_team_memberships,
+)
+from wallet.admin import award_points_action
 
 # Register your custom students functionality here
 
 
+def report_summary(modeladmin, request, summary: dict, success_message: str):
+    failures = {
+        student: error
+        for student, error in summary.items()
+        if isinstance(error, Exception)
+    }
+    succeeded = [student for student in summary if student not in failures]
+    if succeeded:
+        details = ", ".join(f"{student} ({summary[student]})" for student in succeeded)
+        modeladmin.message_user(
+            request, f"{len(succeeded)} {success_message}: {details}."
+        )
+    if failures:
+        details = ", ".join(
+            f"{student} ({error})" for student, error in failures.items()
+        )
+        modeladmin.message_user(
+            request, f"{len(failures)} students failed: {details}.", messages.ERROR
+        )
+
+
 @admin.action(description="Active a student and create a wallet")
 def activate_students(modeladmin, request, queryset):
-    students = queryset
-    for student in students:
-        student.active_user()
+    summary = bulk_activate_students(queryset)
+    report_summary(modeladmin, request, summary, "students processed")
 
 
 @admin.action(description="Invite student to GitHub Team")
 def invite_students(modeladmin, request, queryset):
-    students = queryset
-    for student in students:
-        student.invite_to_github_team()
+    summary = bulk_invite_students(queryset)
+    report_summary(modeladmin, request, summary, "students invited")
+
+
+@admin.action(description="Sync GitHub Team membership")
+def sync_memberships(modeladmin, request, queryset):
+    updated = sync_github_team_memberships(queryset)
+    modeladmin.message_user(request, f"{updated} students synced with GitHub.")
 
 
 # Register your custom students modelsAdmin
@@ -30,13 +61,21 @@ class StudentAdmin(admin.ModelAdmin):
         "get_age",
         "get_membership",
     )
-    actions = (activate_students, invite_students)
+    list_filter = ("is_active", "github_membership")
+    list_select_related = ("user",)
+    actions = (
+        activate_students,
+        invite_students,
+        sync_memberships,
+        award_points_action,
+    )
 
     def get_age(self, obj: Student) -> int:
         return obj.get_age()
 
+    @admin.display(boolean=True)
     def get_membership(self, obj: Student) -> bool:
-        return obj.verify_github_team_membership()
+        return obj.is_github_member
 
     # Custom Name
     get_age.short_description = "Age"
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("student", "0002_rename_create_at_student_created_at_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="student",
+            name="github_membership",
+            field=models.CharField(
+                choices=[
+                    ("active", "Membro"),
+                    ("pending", "Convite pendente"),
+                    ("none", "Não participa"),
+                    ("unknown", "Não verificado"),
+                ],
+                default="unknown",
+                max_length=16,
+            ),
+        ),
+        migrations.AddField(
+            model_name="student",
+            name="github_membership_checked_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
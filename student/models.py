@@ -1,9 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from django.db import models
+from django.utils import timezone
+from social_django.models import UserSocialAuth
 
-from codaqui.settings import AUTH_USER_MODEL
-from github_service.views import invite_user_to_github_team, verify_membership
+from codaqui.settings import AUTH_USER_MODEL, GITHUB_INVITE_WORKERS
+from github_service.views import (
+    get_membership_state,
+    invite_user_to_github_team,
+    list_team_membership_states,
+)
 from users.models import User
 from utils.models import AuditModel
 from wallet.models import Wallet
@@ -12,6 +19,12 @@ from wallet.models import Wallet
 
 
 class Student(AuditModel):
+    class GitHubMembership(models.TextChoices):
+        ACTIVE = "active", "Membro"
+        PENDING = "pending", "Convite pendente"
+        NONE = "none", "Não participa"
+        UNKNOWN = "unknown", "Não verificado"
+
     id = models.BigAutoField(primary_key=True)
     user = models.OneToOneField(
         AUTH_USER_MODEL,
@@ -25,6 +38,14 @@ class Student(AuditModel):
     email = models.EmailField()
     telephone = models.CharField(max_length=20)
     is_active = models.BooleanField(default=False)
+    # Cached GitHub Team state, refreshed by `manage.py sync_team_membership`
+    # so pages never have to ask GitHub while rendering.
+    github_membership = models.CharField(
+        max_length=16,
+        choices=GitHubMembership.choices,
+        default=GitHubMembership.UNKNOWN,
+    )
+    github_membership_checked_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -32,13 +53,25 @@ class Student(AuditModel):
     def get_age(self):
         return datetime.now().year - self.birth_year
 
+    @property
+    def is_github_member(self) -> bool:
+        return self.github_membership == self.GitHubMembership.ACTIVE
+
+    def set_github_membership(self, state: str):
+        self.github_membership = state
+        self.github_membership_checked_at = timezone.now()
+        self.save(update_fields=["github_membership", "github_membership_checked_at"])
+
     def verify_github_team_membership(self):
         github_data = self.user.get_github_data()
-        return verify_membership(github_data)
+        self.set_github_membership(get_membership_state(github_data))
+        return self.is_github_member
 
     def invite_to_github_team(self):
         github_data = self.user.get_github_data()
-        invite_user_to_github_team(github_data)
+        response = invite_user_to_github_team(github_data)
+        if response.status_code == 200:
+            self.set_github_membership(response.json()["state"])
 
     def active_user(self):
         wallet_exists = Wallet.objects.filter(user=self.user).exists()
@@ -52,3 +85,155 @@ class Student(AuditModel):
             self.invite_to_github_team()
             self.is_active = False
             self.save()
+
+
+def get_github_logins(students) -> dict:
+    """
+    Maps user ids to GitHub usernames with a single query, falling back to the
+    local username when the social auth data has no login.
+    """
+    social_auths = dict(
+        UserSocialAuth.objects.filter(
+            provider="github", user_id__in=[student.user_id for student in students]
+        ).values_list("user_id", "extra_data")
+    )
+    return {
+        student.user_id: (social_auths.get(student.user_id) or {}).get("login")
+        or student.user.username
+        for student in students
+    }
+
+
+def sync_github_team_memberships(queryset=None) -> int:
+    """
+    Refreshes the cached GitHub Team membership of every student with a few
+    paginated calls to GitHub and a single bulk update.
+
+    Args:
+        queryset: Optional subset of students to refresh.
+
+    Returns:
+        int: The number of students updated.
+    """
+    if queryset is None:
+        queryset = Student.objects.all()
+    states = list_team_membership_states()
+    students = list(queryset.filter(user__isnull=False).select_related("user"))
+    logins = get_github_logins(students)
+    checked_at = timezone.now()
+    for student in students:
+        student.github_membership = states.get(
+            logins[student.user_id].lower(), Student.GitHubMembership.NONE
+        )
+        student.github_membership_checked_at = checked_at
+    Student.objects.bulk_update(
+        students,
+        ["github_membership", "github_membership_checked_at"],
+        batch_size=500,
+    )
+    return len(students)
+
+
+def _invite(github_username: str) -> str:
+    response = invite_user_to_github_team(github_username)
+    if response.status_code != 200:
+        raise RuntimeError(f"GitHub respondeu {response.status_code}")
+    return response.json()["state"]
+
+
+def invite_students_to_github_team(students, logins: dict) -> dict:
+    """
+    Sends the GitHub Team invites on a bounded thread pool.
+
+    Args:
+        students: The students to invite.
+        logins (dict): User ids mapped to GitHub usernames.
+
+    Returns:
+        dict: Student ids mapped to the new membership state, or to the
+        exception raised while inviting.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=GITHUB_INVITE_WORKERS) as executor:
+        futures = {
+            student.id: executor.submit(_invite, logins[student.user_id])
+            for student in students
+        }
+    for student_id, future in futures.items():
+        try:
+            results[student_id] = future.result()
+        except Exception as error:
+            results[student_id] = error
+    return results
+
+
+def _apply_invite_results(students, results: dict, checked_at) -> dict:
+    summary = {}
+    for student in students:
+        result = results.get(student.id, student.github_membership)
+        if isinstance(result, Exception):
+            summary[student] = result
+            continue
+        student.github_membership = result
+        student.github_membership_checked_at = checked_at
+        summary[student] = result
+    return summary
+
+
+def bulk_invite_students(queryset) -> dict:
+    """
+    Invites many students to the GitHub Team at once.
+
+    Returns:
+        dict: Each student mapped to its membership state or to the error.
+    """
+    students = list(queryset.filter(user__isnull=False).select_related("user"))
+    results = invite_students_to_github_team(students, get_github_logins(students))
+    summary = _apply_invite_results(students, results, timezone.now())
+    Student.objects.bulk_update(
+        students,
+        ["github_membership", "github_membership_checked_at"],
+        batch_size=500,
+    )
+    return summary
+
+
+def bulk_activate_students(queryset) -> dict:
+    """
+    Batched version of :meth:`Student.active_user`.
+
+    Wallets are created with one ``bulk_create``, the team membership of every
+    student comes from a single listing of the GitHub Team, students that are
+    not members yet are invited concurrently and all flags are written back
+    with one ``bulk_update``.
+
+    Returns:
+        dict: Each student mapped to its membership state or to the error.
+    """
+    students = list(queryset.filter(user__isnull=False).select_related("user"))
+    Wallet.objects.bulk_create(
+        [Wallet(user_id=student.user_id) for student in students],
+        ignore_conflicts=True,
+    )
+
+    states = list_team_membership_states()
+    logins = get_github_logins(students)
+    checked_at = timezone.now()
+    for student in students:
+        student.github_membership = states.get(
+            logins[student.user_id].lower(), Student.GitHubMembership.NONE
+        )
+        student.github_membership_checked_at = checked_at
+
+    pending = [student for student in students if not student.is_github_member]
+    results = invite_students_to_github_team(pending, logins)
+    summary = _apply_invite_results(students, results, checked_at)
+    for student in students:
+        student.is_active = student.is_github_member
+
+    Student.objects.bulk_update(
+        students,
+        ["is_active", "github_membership", "github_membership_checked_at"],
+        batch_size=500,
+    )
+    return summary
@@ -1,3 +1,87 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from social_django.models import UserSocialAuth
+
+from student.models import (
+    Student,
+    bulk_activate_students,
+    sync_github_team_memberships,
+)
+from wallet.models import Wallet
+
+User = get_user_model()
+
+
+def create_student(username, login):
+    user = User.objects.create_user(username=username)
+    UserSocialAuth.objects.create(
+        user=user, provider="github", uid=username, extra_data={"login": login}
+    )
+    return Student.objects.create(
+        user=user, name=username, birth_year=2000, email=f"{username}@codaqui.dev"
+    )
+
+
+class TestGitHubMembershipSync(TestCase):
+
+    @mock.patch("student.models.list_team_membership_states")
+    def test_sync_updates_cached_state(self, list_team_membership_states):
+        """Test if the team listing is mapped onto every student"""
+        list_team_membership_states.return_value = {
+            "ana": "active",
+            "bruno": "pending",
+        }
+        ana = create_student("ana", "Ana")
+        bruno = create_student("bruno", "bruno")
+        carla = create_student("carla", "carla")
+
+        assert sync_github_team_memberships() == 3
+
+        ana.refresh_from_db()
+        bruno.refresh_from_db()
+        carla.refresh_from_db()
+        assert ana.is_github_member
+        assert bruno.github_membership == Student.GitHubMembership.PENDING
+        assert carla.github_membership == Student.GitHubMembership.NONE
+        assert carla.github_membership_checked_at is not None
+        list_team_membership_states.assert_called_once()
+
+
+def invite_response(status_code, state=None):
+    response = mock.Mock(status_code=status_code)
+    response.json.return_value = {"state": state}
+    return response
+
+
+class TestBulkActivateStudents(TestCase):
+
+    def setUp(self):
+        self.students = {
+            name: create_student(name, name) for name in ("ana", "bruno", "carla")
+        }
+        Wallet.objects.create(user=self.students["ana"].user)
+
+    @mock.patch("student.models.invite_user_to_github_team")
+    @mock.patch("student.models.list_team_membership_states")
+    def test_activate_students(self, list_team_membership_states, invite):
+        """Test if members are activated, others invited and failures reported"""
+        list_team_membership_states.return_value = {"ana": "active"}
+        invite.side_effect = lambda login: {
+            "bruno": invite_response(200, "pending"),
+            "carla": invite_response(422),
+        }[login]
+
+        summary = bulk_activate_students(Student.objects.all())
 
-# Create your tests here.
+        by_name = {student.name: result for student, result in summary.items()}
+        assert by_name["ana"] == "active"
+        assert by_name["bruno"] == "pending"
+        assert isinstance(by_name["carla"], RuntimeError)
+        assert invite.call_count == 2
+        assert Wallet.objects.count() == 3
+        assert list(
+            Student.objects.filter(is_active=True).values_list("name", flat=True)
+        ) == ["ana"]
+        assert Student.objects.get(name="bruno").github_membership == "pending"
@@ -5,7 +5,8 @@ from django.contrib.auth.models import Group
 
 
 class UsersAdminConfig(admin.ModelAdmin):
-    pass
+    # Also serves the user autocomplete of other admins.
+    search_fields = ("username",)
 
 
 class GroupsAdminConfig(admin.ModelAdmin):
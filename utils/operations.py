@@ -0,0 +1,27 @@
+from django.contrib.postgres import operations
+from django.db import migrations
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    """
+    ``CREATE INDEX CONCURRENTLY`` on PostgreSQL, so large tables stay
+    writable while the index is built. Other databases, such as the SQLite
+    used in development, get a plain ``AddIndex``. Migrations using it must
+    set ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
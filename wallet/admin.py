@@ -1,17 +1,156 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Count, F, Q, Sum
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
 
-from wallet.models import Activities, Wallet
+from wallet.forms import AwardPointsForm
+from wallet.models import (
+    Activities,
+    MonthlyActivity,
+    Transfer,
+    Wallet,
+    award_points,
+)
 
 # Register your models here.
 
+# Below this many rows the exact count is cheap and the estimate is not used.
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+@admin.action(description="Give CodaPoints")
+def award_points_action(modeladmin, request, queryset):
+    """
+    Asks for the amount and description, then credits every selected row's
+    user at once. Works for any model with a ``user`` foreign key, so the
+    student admin can award a whole class.
+    """
+    form = AwardPointsForm(request.POST if "apply" in request.POST else None)
+    if form.is_valid():
+        user_ids = list(queryset.values_list("user_id", flat=True))
+        try:
+            activities = award_points(
+                user_ids, form.cleaned_data["value"], form.cleaned_data["description"]
+            )
+        except (ValueError, Wallet.DoesNotExist) as error:
+            modeladmin.message_user(
+                request, f"No points were given: {error}", messages.ERROR
+            )
+        else:
+            modeladmin.message_user(
+                request, f"{len(activities)} users received CodaPoints."
+            )
+        return None
+
+    return TemplateResponse(
+        request,
+        "admin/wallet/award_points.html",
+        {
+            **modeladmin.admin_site.each_context(request),
+            "title": "Give CodaPoints",
+            "form": form,
+            "queryset": queryset,
+            "opts": modeladmin.model._meta,
+            "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+        },
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that, on PostgreSQL, takes the size of an unfiltered table from
+    the planner statistics instead of a ``COUNT(*)`` over every row.
+    Filtered pages are still counted exactly, through their indexes.
+    """
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if connection.vendor == "postgresql" and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [query.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
 
 class ActivitiesAdmin(admin.ModelAdmin):
-    list_display = ("user", "value", "description")
+    list_display = ("created_at", "user", "value", "description")
+    list_select_related = ("user",)
+    # Both served by indexes: the date ranges by ``activity_created_idx`` and
+    # the username search (see ``get_search_results``) by
+    # ``activity_history_idx``. A date hierarchy is avoided as it lists the
+    # distinct years of the whole table.
+    list_filter = (("created_at", admin.DateFieldListFilter),)
+    search_fields = ("user__username",)
+    ordering = ("-created_at", "-id")
+    autocomplete_fields = ("user",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Adds the CSV/JSON export, filtered by date range, to the changelist.
+    change_list_template = "admin/wallet/activities_change_list.html"
+
+    def get_search_results(self, request, queryset, search_term):
+        # An exact username, so the lookup uses the unique username index
+        # rather than a LIKE scan over every user.
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(user__username=search_term), False
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        changelist = getattr(response, "context_data", {}).get("cl")
+        if changelist is not None:
+            response.context_data["totals"] = self.get_totals(changelist.queryset)
+        return response
+
+    def get_totals(self, queryset) -> dict:
+        """
+        Totals of every activity matching the filters, in one query. The whole
+        ledger is summed from the monthly rollup instead of every activity.
+        """
+        if not queryset.query.where:
+            return MonthlyActivity.objects.aggregate(
+                count=Sum("count", default=0),
+                credits=Sum("credits", default=0),
+                debits=Sum("debits", default=0),
+            )
+        return queryset.order_by().aggregate(
+            count=Count("id"),
+            credits=Sum("value", filter=Q(value__gt=0), default=0),
+            debits=Sum(-F("value"), filter=Q(value__lt=0), default=0),
+        )
 
 
 class WalletAdmin(admin.ModelAdmin):
     list_display = ("user", "balance")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
+    actions = (award_points_action,)
+
+
+class MonthlyActivityAdmin(admin.ModelAdmin):
+    list_display = ("user", "month", "count", "credits", "debits", "net")
+    list_select_related = ("user",)
+    date_hierarchy = "month"
+    search_fields = ("user__username",)
+
+
+class TransferAdmin(admin.ModelAdmin):
+    list_display = ("sender", "recipient", "value", "created_at")
+    list_select_related = ("sender", "recipient")
+    raw_id_fields = ("sender", "recipient", "debit", "credit")
 
 
 admin.site.register(Activities, ActivitiesAdmin)
+admin.site.register(MonthlyActivity, MonthlyActivityAdmin)
+admin.site.register(Transfer, TransferAdmin)
 admin.site.register(Wallet, WalletAdmin)
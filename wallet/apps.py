@@ -5,3 +5,7 @@ class WalletConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "wallet"
     verbose_name = "Configurações - Carteira"
+
+    def ready(self):
+        # Connects the leaderboard cache to balance changes.
+        from wallet import leaderboard  # noqa: F401
@@ -0,0 +1,134 @@
+import atexit
+import logging
+import threading
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import DatabaseError, close_old_connections, transaction
+
+from codaqui.settings import WALLET_AWARD_BATCH_SIZE, WALLET_AWARD_FLUSH_INTERVAL
+from wallet.models import Activities, Wallet, bulk_post_activities
+
+
+class Award(NamedTuple):
+    """
+    CodaPoints due to a user for a contribution. ``reference`` is unique per
+    contribution and user, so an award is posted once however often it is
+    queued.
+    """
+
+    user_id: int
+    value: Decimal
+    description: str
+    reference: str
+
+
+def post_awards(awards: list[Award]) -> int:
+    """
+    Posts awards in one transaction, skipping those already posted and
+    those of users without a wallet.
+
+    Returns:
+        int: The number of activities created.
+    """
+    with transaction.atomic():
+        posted = set(
+            Activities.objects.filter(
+                reference__in={award.reference for award in awards}
+            ).values_list("reference", flat=True)
+        )
+        with_wallet = set(
+            Wallet.objects.filter(
+                user_id__in={award.user_id for award in awards}
+            ).values_list("user_id", flat=True)
+        )
+        fresh = {}
+        for award in awards:
+            if award.reference in posted or award.reference in fresh:
+                continue
+            if award.user_id not in with_wallet:
+                logging.warning(f"Dropping award {award.reference}: no wallet")
+                continue
+            fresh[award.reference] = award
+        bulk_post_activities(fresh.values())
+    return len(fresh)
+
+
+class AwardQueue:
+    """
+    Collects awards in memory and posts them from a background thread every
+    ``interval`` seconds, or as soon as ``batch_size`` are waiting, so a
+    burst of events costs a few commits instead of one each.
+
+    With ``autostart`` off nothing is posted until :meth:`flush` is called.
+    Awards still queued when the process dies are lost: the webhook already
+    answered 2xx, so GitHub never redelivers those events. A clean shutdown
+    flushes through ``atexit``, but a killed worker (or a deploy restart that
+    does not wait) drops up to ``interval`` seconds of awards.
+    """
+
+    def __init__(
+        self,
+        interval: float = WALLET_AWARD_FLUSH_INTERVAL,
+        batch_size: int = WALLET_AWARD_BATCH_SIZE,
+        autostart: bool = True,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.autostart = autostart
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def put(self, awards: list[Award]):
+        if not awards:
+            return
+        with self._lock:
+            self._pending.extend(awards)
+            if self._thread is None and self.autostart:
+                self._thread = threading.Thread(
+                    target=self._run, name="codapoints-awards", daemon=True
+                )
+                self._thread.start()
+                # Posts what is left when the server shuts down cleanly.
+                atexit.register(self.flush)
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """
+        Posts every queued award now.
+
+        Returns:
+            int: The number of activities created.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        try:
+            return post_awards(batch)
+        except DatabaseError:
+            logging.exception(f"Could not post {len(batch)} awards, retrying later")
+            with self._lock:
+                self._pending[:0] = batch
+            return 0
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            # Any error that escaped here would end the thread and silently
+            # stop every later award of this process.
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logging.exception("Award queue flush failed")
+
+
+award_queue = AwardQueue()
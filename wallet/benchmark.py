@@ -0,0 +1,238 @@
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Sum
+
+from wallet.models import (
+    Activities,
+    InsufficientFunds,
+    MonthlyActivity,
+    Transfer,
+    Wallet,
+    post_activity,
+    transfer_points,
+)
+
+OPERATIONS = ("credit", "debit", "delete", "transfer")
+# Seconds between samples of the backends waiting on a lock.
+LOCK_SAMPLE_INTERVAL = 0.01
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    Outcome of :func:`run_benchmark`. Latencies and times are in seconds;
+    ``rejected`` are postings refused for insufficient funds, ``errors``
+    anything else, such as deadlocks.
+    """
+
+    operations: int
+    rejected: int
+    errors: Counter
+    seconds: float
+    throughput: float
+    p50: float
+    p99: float
+    lock_wait: float | None
+    mismatches: list
+    negative: list
+
+    @property
+    def consistent(self) -> bool:
+        return not self.mismatches and not self.negative
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _create_users(count: int, balance: Decimal) -> list:
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    users = get_user_model().objects.bulk_create(
+        get_user_model()(username=f"{prefix}-{index}") for index in range(count)
+    )
+    for user in users:
+        Wallet.objects.create(user=user)
+        post_activity(user, balance, "Saldo inicial do benchmark")
+    return users
+
+
+def cleanup(users):
+    """
+    Removes the benchmark users and everything they posted. Activities are
+    deleted with plain SQL: reverting each one through the delete signal
+    would fail on debits and is not needed for rows about to disappear.
+    """
+    user_ids = [user.pk for user in users]
+    with transaction.atomic():
+        Transfer.objects.filter(sender_id__in=user_ids).delete()
+        MonthlyActivity.objects.filter(user_id__in=user_ids).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(Activities._meta.db_table)} "
+                f"WHERE user_id IN ({', '.join(['%s'] * len(user_ids))})",
+                user_ids,
+            )
+        get_user_model().objects.filter(pk__in=user_ids).delete()
+
+
+def _operation(name: str, users: list, rng: random.Random):
+    user = rng.choice(users)
+    value = Decimal(rng.randint(1, 10))
+    if name == "credit":
+        post_activity(user, value, "Crédito do benchmark")
+    elif name == "debit":
+        post_activity(user, -value, "Débito do benchmark")
+    elif name == "delete":
+        activity = (
+            Activities.objects.filter(
+                user=user, value__gt=0, transfer_credit__isnull=True
+            )
+            .order_by("?")
+            .first()
+        )
+        if activity is not None:
+            activity.delete()
+    else:
+        recipient = rng.choice([other for other in users if other != user])
+        transfer_points(user, recipient, value, uuid.uuid4().hex)
+
+
+def _sample_lock_waits(stop: threading.Event, waited: list):
+    # Each sample adds the interval for every backend blocked on a lock.
+    try:
+        with connection.cursor() as cursor:
+            while not stop.wait(LOCK_SAMPLE_INTERVAL):
+                cursor.execute(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+                )
+                waited[0] += cursor.fetchone()[0] * LOCK_SAMPLE_INTERVAL
+    finally:
+        connection.close()
+
+
+def check_invariants(users) -> tuple[list, list]:
+    """
+    Returns:
+        tuple[list, list]: Users whose balance differs from the sum of their
+        activities, and users with a negative balance.
+    """
+    totals = dict(
+        Activities.objects.filter(user__in=users)
+        .values("user_id")
+        .annotate(total=Sum("value"))
+        .values_list("user_id", "total")
+    )
+    balances = dict(
+        Wallet.objects.filter(user__in=users).values_list("user_id", "balance")
+    )
+    mismatches = [
+        user_id
+        for user_id, balance in balances.items()
+        if balance != totals.get(user_id, 0)
+    ]
+    negative = [user_id for user_id, balance in balances.items() if balance < 0]
+    return mismatches, negative
+
+
+def run_benchmark(
+    workers: int = 50,
+    operations: int = 100,
+    users: int = 10,
+    balance: Decimal = Decimal(100),
+    seed: int = None,
+    keep: bool = False,
+) -> BenchmarkResult:
+    """
+    Posts credits, debits, deletes and transfers from many threads at once
+    against a few shared wallets, then checks the ledger invariants.
+
+    Every thread has its own database connection, so on PostgreSQL the
+    writers contend for the same wallet rows as real requests would.
+
+    Args:
+        workers (int): Concurrent writer threads.
+        operations (int): Operations per thread.
+        users (int): Wallets shared by the threads; fewer means more
+            contention.
+        balance (Decimal): Starting balance of every wallet.
+        seed (int): Makes the operation mix reproducible.
+        keep (bool): Keep the benchmark users and activities afterwards.
+
+    Returns:
+        BenchmarkResult: Throughput, latencies, lock waits and invariants.
+    """
+    accounts = _create_users(users, balance)
+    latencies = []
+    rejected = [0]
+    errors = Counter()
+    lock = threading.Lock()
+
+    def worker(index: int):
+        rng = random.Random(None if seed is None else seed + index)
+        mine, refused, failed = [], 0, Counter()
+        try:
+            for _ in range(operations):
+                name = rng.choice(OPERATIONS)
+                started = time.perf_counter()
+                try:
+                    _operation(name, accounts, rng)
+                except InsufficientFunds:
+                    refused += 1
+                except DatabaseError as error:
+                    failed[type(error).__name__] += 1
+                mine.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+            with lock:
+                latencies.extend(mine)
+                rejected[0] += refused
+                errors.update(failed)
+
+    waited = [0.0]
+    stop = threading.Event()
+    sampler = None
+    if connection.vendor == "postgresql":
+        sampler = threading.Thread(target=_sample_lock_waits, args=(stop, waited))
+        sampler.start()
+
+    threads = [
+        threading.Thread(target=worker, args=(index,)) for index in range(workers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    stop.set()
+    if sampler is not None:
+        sampler.join()
+
+    mismatches, negative = check_invariants(accounts)
+    if not keep:
+        cleanup(accounts)
+
+    latencies.sort()
+    return BenchmarkResult(
+        operations=len(latencies),
+        rejected=rejected[0],
+        errors=errors,
+        seconds=seconds,
+        throughput=len(latencies) / seconds if seconds else 0.0,
+        p50=_percentile(latencies, 0.50),
+        p99=_percentile(latencies, 0.99),
+        lock_wait=waited[0] if sampler is not None else None,
+        mismatches=mismatches,
+        negative=negative,
+    )
@@ -0,0 +1,84 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from codaqui.settings import WALLET_EXPORT_CHUNK_SIZE
+
+EXPORT_FORMATS = ("csv", "json")
+
+# Spreadsheets run a cell starting with one of these as a formula, so a
+# description such as "=HYPERLINK(...)" would execute on the staff machine.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class _Echo:
+    # csv.writer only needs ``write``; returning the line lets each row be
+    # yielded to the response instead of buffered.
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    # Only text is escaped; negative numbers are not formulas.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def _csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+def _json_lines(columns, rows):
+    encoder = DjangoJSONEncoder()
+    yield "["
+    separator = "\n"
+    for row in rows:
+        yield separator + encoder.encode(dict(zip(columns, row)))
+        separator = ",\n"
+    yield "\n]\n"
+
+
+def export_rows(queryset, columns: list[str]):
+    """
+    Streams ``columns`` of every row of ``queryset`` as tuples, through a
+    server-side cursor.
+    """
+    return queryset.values_list(*columns).iterator(chunk_size=WALLET_EXPORT_CHUNK_SIZE)
+
+
+def export_response(
+    queryset, columns: list[str], export_format: str, filename: str
+) -> StreamingHttpResponse:
+    """
+    Streams a queryset as a CSV or JSON download.
+
+    Rows are read in chunks and written as they arrive, so memory stays flat
+    however many rows are exported.
+
+    Args:
+        queryset: The rows to export, already filtered and ordered.
+        columns (list[str]): Fields to export; lookups such as
+            ``user__username`` are allowed and also name the columns.
+        export_format (str): ``csv`` or ``json``.
+        filename (str): Download name, without the extension.
+
+    Returns:
+        StreamingHttpResponse: The download.
+    """
+    rows = export_rows(queryset, columns)
+    if export_format == "json":
+        lines, content_type = _json_lines(columns, rows), "application/json"
+    else:
+        lines, content_type = _csv_lines(columns, rows), "text/csv"
+    return StreamingHttpResponse(
+        lines,
+        content_type=content_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
@@ -0,0 +1,27 @@
+from decimal import Decimal
+
+from django import forms
+from django.contrib.auth import get_user_model
+
+
+class AwardPointsForm(forms.Form):
+    value = forms.DecimalField(max_digits=8, decimal_places=2, label="CodaPoints")
+    description = forms.CharField(max_length=255, label="Description")
+
+
+class TransferForm(forms.Form):
+    recipient = forms.CharField(max_length=150, label="Usuário de destino")
+    value = forms.DecimalField(
+        max_digits=8, decimal_places=2, min_value=Decimal("0.01"), label="CodaPoints"
+    )
+    description = forms.CharField(max_length=200, required=False, label="Mensagem")
+    # Generated when the form is shown and sent back on submit, so a
+    # double-submitted or retried form makes a single transfer.
+    idempotency_key = forms.CharField(max_length=64, widget=forms.HiddenInput)
+
+    def clean_recipient(self):
+        username = self.cleaned_data["recipient"]
+        recipient = get_user_model().objects.filter(username=username).first()
+        if recipient is None:
+            raise forms.ValidationError("Usuário não encontrado.")
+        return recipient
@@ -0,0 +1,118 @@
+import time
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import receiver
+
+from codaqui.settings import WALLET_LEADERBOARD_SIZE, WALLET_LEADERBOARD_TIMEOUT
+from wallet.models import Wallet, balances_changed
+
+CACHE_KEY = "wallet:leaderboard"
+# Bumped on every committed balance change; cached ranks of older
+# generations are never read again and simply expire. A missing counter
+# (never set, or evicted) is seeded from the clock, never from a small
+# number that an earlier generation may already have used.
+RANK_GENERATION_KEY = "wallet:rank-generation"
+# Cached for users without a wallet, which ``cache.get`` cannot tell from a
+# miss if stored as ``None``.
+NO_RANK = 0
+
+
+class LeaderboardEntry(NamedTuple):
+    rank: int
+    user_id: int
+    username: str
+    balance: Decimal
+
+
+def load_leaderboard() -> list[LeaderboardEntry]:
+    """
+    Reads the ``WALLET_LEADERBOARD_SIZE`` largest balances, from the top of
+    ``wallet_balance_idx``. Tied balances share a rank.
+    """
+    rows = Wallet.objects.order_by("-balance", "user_id").values_list(
+        "user_id", "user__username", "balance"
+    )[:WALLET_LEADERBOARD_SIZE]
+    entries = []
+    for position, (user_id, username, balance) in enumerate(rows, start=1):
+        if entries and entries[-1].balance == balance:
+            position = entries[-1].rank
+        entries.append(LeaderboardEntry(position, user_id, username, balance))
+    return entries
+
+
+def get_leaderboard() -> list[LeaderboardEntry]:
+    """
+    The cached top of the leaderboard, loaded again only after a balance
+    change that can alter it.
+    """
+    return cache.get_or_set(CACHE_KEY, load_leaderboard, WALLET_LEADERBOARD_TIMEOUT)
+
+
+def load_rank(user) -> int | None:
+    """
+    One plus the number of larger balances, counted on ``wallet_balance_idx``
+    without reading the table, or ``None`` without a wallet.
+    """
+    balance = Wallet.objects.filter(user=user).values_list("balance", flat=True).first()
+    if balance is None:
+        return None
+    return Wallet.objects.filter(balance__gt=balance).count() + 1
+
+
+def user_rank(user) -> int | None:
+    """
+    Position of the user on the leaderboard, or ``None`` without a wallet.
+
+    Users on the cached top need no query. The others' ranks are cached
+    until the next balance change, so rendering the home page again does not
+    count the larger balances every time.
+    """
+    for entry in get_leaderboard():
+        if entry.user_id == user.pk:
+            return entry.rank
+    generation = cache.get_or_set(RANK_GENERATION_KEY, time.time_ns, None)
+    key = f"wallet:rank:{user.pk}:{generation}"
+    rank = cache.get(key)
+    if rank is None:
+        rank = load_rank(user) or NO_RANK
+        cache.set(key, rank, WALLET_LEADERBOARD_TIMEOUT)
+    return rank or None
+
+
+def _can_change(entries: list[LeaderboardEntry], deltas: dict) -> bool:
+    if any(entry.user_id in deltas for entry in entries):
+        return True
+    raised = [user_id for user_id, value in deltas.items() if value > 0]
+    if not raised:
+        # Debits outside the top never reach it.
+        return False
+    if len(entries) < WALLET_LEADERBOARD_SIZE:
+        return True
+    return Wallet.objects.filter(
+        user_id__in=raised, balance__gte=entries[-1].balance
+    ).exists()
+
+
+@receiver(balances_changed, sender=Wallet)
+def update_leaderboard(sender, deltas, **kwargs):
+    """
+    Drops the cached leaderboard once the change is committed, but only when
+    it can alter the top: a balance on it moved, or a credit may have lifted
+    someone past the last entry. Every change moves some rank, so all cached
+    ranks are retired.
+    """
+
+    def invalidate():
+        entries = cache.get(CACHE_KEY)
+        if entries is not None and _can_change(entries, deltas):
+            cache.delete(CACHE_KEY)
+        try:
+            cache.incr(RANK_GENERATION_KEY)
+        except ValueError:
+            # Nothing cached yet, or evicted: a fresh generation starts.
+            cache.set(RANK_GENERATION_KEY, time.time_ns(), None)
+
+    transaction.on_commit(invalidate)
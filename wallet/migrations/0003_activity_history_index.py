@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+from utils.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY keeps the ledger writable while the index is
+    # built, and cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("wallet", "0002_rename_create_at_activities_created_at_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="activities",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="activity_history_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallet", "0004_reconciliation_run"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="wallet",
+            index=models.Index(fields=["-balance", "user"], name="wallet_balance_idx"),
+        ),
+    ]
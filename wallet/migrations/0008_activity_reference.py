@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+# The unique index is built concurrently so postings keep flowing; a plain
+# unique AddField would hold an ACCESS EXCLUSIVE lock on the ledger for the
+# whole build.
+INDEX = "activity_reference_uniq"
+
+
+def create_unique_index(apps, schema_editor):
+    concurrently = (
+        "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    )
+    table = schema_editor.quote_name(
+        apps.get_model("wallet", "Activities")._meta.db_table
+    )
+    schema_editor.execute(
+        f"CREATE UNIQUE INDEX {concurrently}{INDEX} ON {table} (reference)"
+    )
+
+
+def drop_unique_index(apps, schema_editor):
+    concurrently = (
+        "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    )
+    schema_editor.execute(f"DROP INDEX {concurrently}{INDEX}")
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("wallet", "0007_transfer"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name="activities",
+                    name="reference",
+                    field=models.CharField(
+                        blank=True, max_length=255, null=True, unique=True
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.AddField(
+                    model_name="activities",
+                    name="reference",
+                    field=models.CharField(blank=True, max_length=255, null=True),
+                ),
+                migrations.RunPython(create_unique_index, drop_unique_index),
+            ],
+        ),
+    ]
@@ -1,14 +1,24 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import defaultdict
+from datetime import date, datetime
 from decimal import Decimal
+from typing import NamedTuple
 
-from django.db import models
-from django.db.models.signals import pre_delete, pre_save
-from django.dispatch import receiver
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
 
-from codaqui.settings import AUTH_USER_MODEL
+from codaqui.settings import AUTH_USER_MODEL, WALLET_HISTORY_PAGE_SIZE
 from utils.models import AuditModel
 
 # Create your models here.
 
+# Sent with ``deltas`` (user id to the amount added) whenever balances change.
+balances_changed = Signal()
+
 
 class Activities(AuditModel):
     user = models.ForeignKey(
@@ -18,10 +28,61 @@ class Activities(AuditModel):
 
     value = models.DecimalField(max_digits=8, decimal_places=2)
     description = models.CharField(max_length=255)
+    # Identifies activities posted automatically, e.g. for a merged pull
+    # request, so the same contribution never pays twice.
+    reference = models.CharField(max_length=255, null=True, blank=True, unique=True)
+
+    class Meta:
+        indexes = [
+            # Serves the keyset-paginated history of one user.
+            models.Index(
+                fields=["user", "-created_at", "-id"], name="activity_history_idx"
+            ),
+            # Serves the date filters and ordering of the admin changelist.
+            models.Index(fields=["-created_at", "-id"], name="activity_created_idx"),
+        ]
 
     def __str__(self):
         return str(self.value)
 
+    def save(self, *args, **kwargs):
+        # The activity and the balance change it causes are written in the
+        # same transaction: either both happen or neither does.
+        with transaction.atomic():
+            if self._state.adding:
+                value = as_decimal(self.value)
+                if value:
+                    change_balance(self.user_id, value)
+                super().save(*args, **kwargs)
+                record_monthly_activity([rollup_entry(self)])
+                return
+
+            # Editing takes the previous value back out of the previous
+            # owner's wallet and month, then applies the new one: the value,
+            # the user or both may have changed.
+            previous_user_id, previous_value = (
+                Activities.objects.select_for_update()
+                .values_list("user_id", "value")
+                .get(pk=self.pk)
+            )
+            value = as_decimal(self.value)
+            if (previous_user_id, previous_value) == (self.user_id, value):
+                super().save(*args, **kwargs)
+                return
+            deltas = defaultdict(Decimal)
+            deltas[previous_user_id] -= previous_value
+            deltas[self.user_id] += value
+            apply_balance_deltas(deltas)
+            super().save(*args, **kwargs)
+            record_monthly_activity(
+                [
+                    rollup_entry(
+                        self, sign=-1, value=previous_value, user_id=previous_user_id
+                    ),
+                    rollup_entry(self),
+                ]
+            )
+
 
 class Wallet(AuditModel):
     user = models.OneToOneField(
@@ -31,37 +92,547 @@ class Wallet(AuditModel):
     )
     balance = models.DecimalField(max_digits=8, decimal_places=2, default=0.0)
 
+    class Meta:
+        indexes = [
+            # Serves the leaderboard and rank lookups.
+            models.Index(fields=["-balance", "user"], name="wallet_balance_idx"),
+        ]
+
     def __str__(self):
         return str(self.balance)
 
     def credit(self, value: Decimal):
-        if type(value) != Decimal:
-            value = Decimal(value)
-        if type(self.balance) != Decimal:
-            self.balance = Decimal(self.balance)
+        value = as_decimal(value)
         if value < 0:
             value = 0
-        self.balance = self.balance + value
-        self.save()
+        change_balance(self.user_id, value)
+        self.refresh_from_db(fields=["balance"])
 
     def debit(self, value: Decimal):
-        if type(value) != Decimal:
-            value = Decimal(value)
-        if type(self.balance) != Decimal:
-            self.balance = Decimal(self.balance)
-        self.balance = self.balance - value
-        self.save()
-
-    @receiver(pre_save, sender=Activities)
-    def activities_created(sender, instance, **kwargs):
-        wallet = Wallet.objects.select_for_update().get(user=instance.user)
-        if instance.value < 0 and wallet.balance < abs(instance.value):
-            raise ValueError("Saldo insuficiente")
-        wallet.credit(instance.value)
+        change_balance(self.user_id, -as_decimal(value))
+        self.refresh_from_db(fields=["balance"])
 
     @receiver(pre_delete, sender=Activities)
     def transaction_deleted(sender, instance, **kwargs):
-        wallet = Wallet.objects.get(user=instance.user)
+        # Sent inside the transaction of the delete, so the reversal is
+        # rolled back with it.
         if instance.value < 0:
             raise ValueError("Não é possível excluir uma transação de crédito")
-        wallet.debit(instance.value)
\ No newline at end of file
+        change_balance(instance.user_id, -as_decimal(instance.value))
+        record_monthly_activity([rollup_entry(instance, sign=-1)])
+
+
+class MonthlyActivity(models.Model):
+    """
+    Activities of a user rolled up per month, kept up to date as activities
+    are posted, edited and deleted. ``debits`` holds the spent points as a
+    positive amount.
+    """
+
+    user = models.ForeignKey(
+        AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="monthly_activities",
+    )
+    month = models.DateField(help_text="First day of the month")
+    count = models.IntegerField(default=0)
+    credits = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    debits = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "month"], name="unique_monthly_activity"
+            ),
+        ]
+        verbose_name_plural = "monthly activities"
+
+    def __str__(self):
+        return f"{self.user} {self.month:%Y-%m}"
+
+    @property
+    def net(self) -> Decimal:
+        return self.credits - self.debits
+
+
+class Transfer(AuditModel):
+    """
+    CodaPoints sent from one user to another, recorded as a paired debit and
+    credit activity. ``idempotency_key`` is chosen by the client, so a
+    retried request returns the first transfer instead of paying twice.
+    """
+
+    sender = models.ForeignKey(
+        AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="sent_transfers"
+    )
+    recipient = models.ForeignKey(
+        AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="received_transfers"
+    )
+    value = models.DecimalField(max_digits=8, decimal_places=2)
+    idempotency_key = models.CharField(max_length=64)
+    debit = models.OneToOneField(
+        Activities, on_delete=models.PROTECT, related_name="transfer_debit"
+    )
+    credit = models.OneToOneField(
+        Activities, on_delete=models.PROTECT, related_name="transfer_credit"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sender", "idempotency_key"], name="unique_transfer_key"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.sender} -> {self.recipient}: {self.value}"
+
+
+class ReconciliationRun(models.Model):
+    """
+    A run of the ledger reconciliation. The next incremental run only checks
+    users with activity since the last finished run started.
+    """
+
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    full = models.BooleanField(default=False)
+    checked = models.PositiveIntegerField(default=0)
+    mismatches = models.PositiveIntegerField(default=0)
+    fixed = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.started_at:%Y-%m-%d %H:%M} ({self.mismatches} mismatches)"
+
+
+class InsufficientFunds(ValueError):
+    """
+    Raised when a balance change would leave the wallet negative.
+    """
+
+    def __init__(self, message="Saldo insuficiente"):
+        super().__init__(message)
+
+
+def as_decimal(value) -> Decimal:
+    # Going through str keeps floats such as 0.1 at their written value.
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def change_balance(user_id: int, value: Decimal):
+    """
+    Adds ``value`` (negative to debit) to a wallet with a single conditional
+    ``UPDATE ... SET balance = balance + value WHERE balance + value >= 0``.
+
+    The row lock is held only for the statement (or the enclosing
+    transaction) and no balance is read beforehand, so concurrent postings
+    never overwrite each other.
+
+    Args:
+        user_id (int): The wallet owner.
+        value (Decimal): The amount to add.
+
+    Raises:
+        InsufficientFunds: If the balance would become negative.
+        Wallet.DoesNotExist: If the user has no wallet.
+    """
+    value = as_decimal(value)
+    updated = Wallet.objects.filter(user_id=user_id, balance__gte=-value).update(
+        balance=F("balance") + value, updated_at=timezone.now()
+    )
+    if not updated:
+        if not Wallet.objects.filter(user_id=user_id).exists():
+            raise Wallet.DoesNotExist(f"User {user_id} has no wallet")
+        raise InsufficientFunds()
+    balances_changed.send(sender=Wallet, deltas={user_id: value})
+
+
+def month_of(moment: datetime) -> date:
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def rollup_entry(
+    activity: Activities, sign: int = 1, value: Decimal = None, user_id: int = None
+):
+    """
+    The change ``activity`` makes to its month, as ``(user_id, month, count,
+    credits, debits)``. ``sign=-1`` takes it back out, e.g. when deleted;
+    ``value`` and ``user_id`` override the activity's, e.g. with the ones
+    before an edit.
+    """
+    value = as_decimal(activity.value if value is None else value)
+    credits, debits = (value, Decimal(0)) if value > 0 else (Decimal(0), -value)
+    return (
+        activity.user_id if user_id is None else user_id,
+        month_of(activity.created_at),
+        sign,
+        sign * credits,
+        sign * debits,
+    )
+
+
+def record_monthly_activity(entries):
+    """
+    Adds rollup entries to :class:`MonthlyActivity` with a single
+    ``INSERT ... ON CONFLICT DO UPDATE`` that increments the existing rows.
+
+    Args:
+        entries: Iterable of :func:`rollup_entry` tuples.
+    """
+    totals = defaultdict(lambda: [0, Decimal(0), Decimal(0)])
+    for user_id, month, count, credits, debits in entries:
+        total = totals[user_id, month]
+        total[0] += count
+        total[1] += credits
+        total[2] += debits
+    if not totals:
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(MonthlyActivity._meta.db_table)
+    columns = ["user_id", "month", "count", "credits", "debits"]
+    params = []
+    for user_id, month, count, credits, debits in (
+        (*key, *total) for key, total in totals.items()
+    ):
+        params += [user_id, connection.ops.adapt_datefield_value(month), count]
+        params += [str(credits), str(debits)]
+    rows = ", ".join(["(%s, %s, %s, %s, %s)"] * len(totals))
+    increments = ", ".join(
+        f"{quote(column)} = {table}.{quote(column)} + excluded.{quote(column)}"
+        for column in columns[2:]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(map(quote, columns))}) "
+            f"VALUES {rows} "
+            f"ON CONFLICT ({quote('user_id')}, {quote('month')}) "
+            f"DO UPDATE SET {increments}",
+            params,
+        )
+
+
+def rebuild_monthly_activity() -> int:
+    """
+    Rebuilds :class:`MonthlyActivity` from the whole ledger with one
+    ``GROUP BY`` over the activities, e.g. to backfill the rollup.
+
+    Returns:
+        int: The number of rollup rows written.
+    """
+    rows = (
+        Activities.objects.annotate(
+            month=TruncMonth("created_at", output_field=models.DateField())
+        )
+        .values("user_id", "month")
+        .annotate(
+            count=Count("id"),
+            credits=Sum("value", filter=Q(value__gt=0), default=0),
+            debits=Sum(-F("value"), filter=Q(value__lt=0), default=0),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        MonthlyActivity.objects.all().delete()
+        created = MonthlyActivity.objects.bulk_create(
+            (MonthlyActivity(**row) for row in rows.iterator()), batch_size=1000
+        )
+    return len(created)
+
+
+def monthly_summary(user, months: int = 12) -> list[MonthlyActivity]:
+    """
+    The last ``months`` months with activity of a user, newest first.
+    """
+    return list(MonthlyActivity.objects.filter(user=user).order_by("-month")[:months])
+
+
+def post_activity(user, value: Decimal, description: str) -> Activities:
+    """
+    Records an activity and applies it to the user's wallet atomically.
+
+    Args:
+        user: The user receiving (positive) or spending (negative) points.
+        value (Decimal): The amount.
+        description (str): Shown in the wallet history.
+
+    Returns:
+        Activities: The saved activity.
+
+    Raises:
+        InsufficientFunds: If a debit exceeds the balance; nothing is saved.
+    """
+    return Activities.objects.create(
+        user=user, value=as_decimal(value), description=description
+    )
+
+
+def _update_balances_postgresql(deltas: dict) -> int:
+    # One UPDATE joined on the per-user deltas, passed as two arrays.
+    quote = connection.ops.quote_name
+    table = quote(Wallet._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table} AS wallet
+            SET balance = wallet.balance + delta.value, updated_at = %s
+            FROM unnest(%s::bigint[], %s::numeric[]) AS delta(user_id, value)
+            WHERE wallet.user_id = delta.user_id
+              AND wallet.balance + delta.value >= 0
+            """,
+            [timezone.now(), list(deltas), list(deltas.values())],
+        )
+        return cursor.rowcount
+
+
+def _update_balances_generic(deltas: dict) -> int:
+    delta = Case(
+        *(
+            When(user_id=user_id, then=Value(value))
+            for user_id, value in deltas.items()
+        ),
+        output_field=Wallet._meta.get_field("balance"),
+    )
+    return Wallet.objects.filter(user_id__in=deltas, balance__gte=-delta).update(
+        balance=F("balance") + delta, updated_at=timezone.now()
+    )
+
+
+def apply_balance_deltas(deltas: dict):
+    """
+    Adds a delta to many wallets with one set-based ``UPDATE``, keeping every
+    balance non-negative. Either all wallets change or none does.
+
+    Args:
+        deltas (dict): User id to the amount to add (negative to debit).
+
+    Raises:
+        InsufficientFunds: If any balance would become negative.
+        Wallet.DoesNotExist: If any user has no wallet.
+    """
+    deltas = {user_id: value for user_id, value in deltas.items() if value}
+    if not deltas:
+        return
+    with transaction.atomic():
+        if len(deltas) > 1:
+            # The UPDATE locks rows in whatever order its plan visits them, so
+            # two batches touching the same wallets could deadlock. Taking the
+            # locks first, always in user order, makes them queue instead.
+            list(
+                Wallet.objects.select_for_update()
+                .filter(user_id__in=deltas)
+                .order_by("user_id")
+                .values_list("pk")
+            )
+        if connection.vendor == "postgresql":
+            updated = _update_balances_postgresql(deltas)
+        else:
+            updated = _update_balances_generic(deltas)
+        if updated == len(deltas):
+            balances_changed.send(sender=Wallet, deltas=deltas)
+            return
+        # Only on failure: find out why, then roll the partial update back.
+        found = set(
+            Wallet.objects.filter(user_id__in=deltas).values_list("user_id", flat=True)
+        )
+        missing = sorted(set(deltas) - found)
+        if missing:
+            raise Wallet.DoesNotExist(f"Users without a wallet: {missing}")
+        raise InsufficientFunds()
+
+
+def bulk_post_activities(entries) -> list[Activities]:
+    """
+    Records many activities at once: one ``bulk_create`` for the rows, one
+    ``UPDATE`` for the aggregated balance changes and one upsert for the
+    monthly rollup, in a transaction.
+
+    Args:
+        entries: Iterable of ``(user_id, value, description)``, optionally
+            followed by the activity ``reference``.
+
+    Returns:
+        list[Activities]: The created activities.
+
+    Raises:
+        InsufficientFunds: If any balance would become negative; nothing is
+            saved.
+    """
+    activities = [
+        Activities(
+            user_id=user_id,
+            value=as_decimal(value),
+            description=description,
+            reference=reference[0] if reference else None,
+        )
+        for user_id, value, description, *reference in entries
+    ]
+    deltas = defaultdict(Decimal)
+    for activity in activities:
+        deltas[activity.user_id] += activity.value
+
+    with transaction.atomic():
+        apply_balance_deltas(deltas)
+        Activities.objects.bulk_create(activities, batch_size=1000)
+        record_monthly_activity(rollup_entry(activity) for activity in activities)
+    return activities
+
+
+def award_points(user_ids, value: Decimal, description: str) -> list[Activities]:
+    """
+    Gives the same amount of CodaPoints to every user, e.g. a whole class.
+    """
+    return bulk_post_activities(
+        (user_id, value, description) for user_id in set(user_ids)
+    )
+
+
+class HistoryPage(NamedTuple):
+    """
+    One page of a wallet history, newest first. ``next_cursor`` points to the
+    page of older activities, or is ``None`` on the last page.
+    """
+
+    activities: list
+    next_cursor: str | None
+
+
+def encode_history_cursor(activity: Activities) -> str:
+    position = f"{activity.created_at.isoformat()}|{activity.pk}"
+    return urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Raises:
+        ValueError: The cursor was not produced by :func:`encode_history_cursor`.
+    """
+    try:
+        created_at, pk = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError as error:
+        raise ValueError(f"Invalid history cursor: {cursor!r}") from error
+
+
+def history_page(user, after: str = None, size: int = WALLET_HISTORY_PAGE_SIZE):
+    """
+    Reads one page of a user's activities with keyset pagination.
+
+    Each page starts right after the last ``(created_at, id)`` of the previous
+    one, so it is an index range scan on ``activity_history_idx`` no matter
+    how long the history is, and never skips or repeats activities posted
+    while the student is paging.
+
+    Args:
+        user: The owner of the history.
+        after (str): Cursor from a previous page; the first page when empty.
+        size (int): Activities per page.
+
+    Returns:
+        HistoryPage: The activities and the cursor of the next page.
+
+    Raises:
+        ValueError: The cursor is invalid.
+    """
+    queryset = Activities.objects.filter(user=user)
+    if after:
+        created_at, pk = decode_history_cursor(after)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+    # One extra row tells whether there is a next page without a COUNT.
+    activities = list(
+        queryset.order_by("-created_at", "-id").only(
+            "created_at", "value", "description"
+        )[: size + 1]
+    )
+    if len(activities) <= size:
+        return HistoryPage(activities, None)
+    activities = activities[:size]
+    return HistoryPage(activities, encode_history_cursor(activities[-1]))
+
+
+def transfer_points(
+    sender, recipient, value: Decimal, idempotency_key: str, description: str = ""
+) -> Transfer:
+    """
+    Sends CodaPoints from ``sender`` to ``recipient``.
+
+    Both wallets are locked in user id order before any balance changes, so
+    two opposite transfers running at the same time wait for each other
+    instead of deadlocking. The debit, the credit and the transfer record
+    are written in one transaction.
+
+    Args:
+        sender: The paying user.
+        recipient: The receiving user.
+        value (Decimal): Points to send, greater than zero.
+        idempotency_key (str): Unique per sender; repeating it returns the
+            transfer already made with it.
+        description (str): Shown in both histories.
+
+    Returns:
+        Transfer: The transfer made with ``idempotency_key``.
+
+    Raises:
+        InsufficientFunds: If the sender does not have ``value`` points.
+        Wallet.DoesNotExist: If either user has no wallet.
+        ValueError: If the value is not positive, the users are the same or
+            the key was used for a different transfer.
+    """
+    value = as_decimal(value)
+    if value <= 0:
+        raise ValueError("O valor da transferência deve ser positivo")
+    if sender.pk == recipient.pk:
+        raise ValueError("Não é possível transferir para si mesmo")
+
+    def existing():
+        transfer = Transfer.objects.filter(
+            sender=sender, idempotency_key=idempotency_key
+        ).first()
+        if transfer and (transfer.recipient_id, transfer.value) != (
+            recipient.pk,
+            value,
+        ):
+            raise ValueError("Chave de idempotência já usada em outra transferência")
+        return transfer
+
+    transfer = existing()
+    if transfer is not None:
+        return transfer
+
+    note = f": {description}" if description else ""
+    try:
+        with transaction.atomic():
+            locked = list(
+                Wallet.objects.select_for_update()
+                .filter(user_id__in=[sender.pk, recipient.pk])
+                .order_by("user_id")
+                .values_list("user_id", flat=True)
+            )
+            if len(locked) != 2:
+                raise Wallet.DoesNotExist("Both users need a wallet to transfer")
+            debit, credit = bulk_post_activities(
+                [
+                    (
+                        sender.pk,
+                        -value,
+                        f"Transferência para {recipient.username}{note}",
+                    ),
+                    (recipient.pk, value, f"Transferência de {sender.username}{note}"),
+                ]
+            )
+            return Transfer.objects.create(
+                sender=sender,
+                recipient=recipient,
+                value=value,
+                idempotency_key=idempotency_key,
+                debit=debit,
+                credit=credit,
+            )
+    except IntegrityError:
+        # A concurrent retry with the same key won; return its transfer.
+        transfer = existing()
+        if transfer is None:
+            raise
+        return transfer
@@ -0,0 +1,224 @@
+from decimal import Decimal
+from itertools import islice
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import (
+    DecimalField,
+    Exists,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from codaqui.settings import WALLET_RECONCILE_CHUNK_SIZE
+from wallet.models import Activities, ReconciliationRun, Wallet, balances_changed
+
+
+class Mismatch(NamedTuple):
+    """
+    A wallet whose balance differs from the sum of its activities.
+    """
+
+    user_id: int
+    balance: Decimal
+    expected: Decimal
+
+
+def last_reconciled_at():
+    """
+    When the last finished reconciliation started, or ``None``.
+    """
+    return (
+        ReconciliationRun.objects.filter(finished_at__isnull=False)
+        .order_by("-started_at")
+        .values_list("started_at", flat=True)
+        .first()
+    )
+
+
+def activity_totals(since=None, chunk_size: int = WALLET_RECONCILE_CHUNK_SIZE):
+    """
+    Streams ``(user_id, total)`` for every user with activities, from one
+    ``GROUP BY`` query read through a server-side cursor.
+
+    Args:
+        since (datetime): Only users whose activities or wallet changed
+            since; deleting an activity only leaves a trace on the wallet.
+        chunk_size (int): Rows fetched from the cursor at a time.
+    """
+    queryset = Activities.objects.all()
+    if since is not None:
+        queryset = queryset.filter(
+            Q(
+                user_id__in=Activities.objects.filter(updated_at__gte=since).values(
+                    "user_id"
+                )
+            )
+            | Q(
+                user_id__in=Wallet.objects.filter(updated_at__gte=since).values(
+                    "user_id"
+                )
+            )
+        )
+    return (
+        queryset.values("user_id")
+        .annotate(total=Sum("value"))
+        .order_by("user_id")
+        .values_list("user_id", "total")
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _chunks(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def compare_balances(expected: dict) -> list[Mismatch]:
+    """
+    Compares the wallets of a chunk of users with their activity totals.
+
+    Args:
+        expected (dict): ``{user_id: total}`` from :func:`activity_totals`.
+    """
+    balances = Wallet.objects.filter(user_id__in=expected).values_list(
+        "user_id", "balance"
+    )
+    return [
+        Mismatch(user_id, balance, expected[user_id])
+        for user_id, balance in balances
+        if balance != expected[user_id]
+    ]
+
+
+def wallets_without_activity(since=None):
+    """
+    Streams wallets holding a balance without a single activity to back it.
+    """
+    queryset = Wallet.objects.exclude(balance=0).filter(
+        ~Exists(Activities.objects.filter(user_id=OuterRef("user_id")))
+    )
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
+    for user_id, balance in queryset.values_list("user_id", "balance").iterator(
+        chunk_size=WALLET_RECONCILE_CHUNK_SIZE
+    ):
+        yield Mismatch(user_id, balance, Decimal(0))
+
+
+def _current(user_id: int) -> Mismatch | None:
+    # Balance and sum read by one statement, so a posting can not land
+    # between them.
+    row = (
+        Wallet.objects.filter(user_id=user_id)
+        .annotate(
+            expected=Coalesce(
+                Subquery(
+                    Activities.objects.filter(user_id=OuterRef("user_id"))
+                    .values("user_id")
+                    .annotate(total=Sum("value"))
+                    .values("total")
+                ),
+                Value(Decimal(0)),
+                output_field=DecimalField(),
+            )
+        )
+        .values_list("balance", "expected")
+        .first()
+    )
+    if row is None or row[0] == row[1]:
+        return None
+    return Mismatch(user_id, *row)
+
+
+def confirm_mismatch(candidate: Mismatch) -> Mismatch | None:
+    """
+    Checks a mismatch found by :func:`compare_balances` again. The chunk
+    compared sums read earlier with balances read later, so a posting in
+    between looks like a mismatch until both are read together.
+
+    Returns:
+        Mismatch | None: The current mismatch, or ``None`` if it is gone.
+    """
+    return _current(candidate.user_id)
+
+
+def fix_mismatch(candidate: Mismatch) -> Mismatch | None:
+    """
+    Sets a wallet balance to the sum of its activities.
+
+    The wallet is locked before the balance and the sum are read again:
+    postings update the wallet before they commit, so none can be halfway
+    while the lock is held and the fix never overwrites a fresh posting.
+
+    Returns:
+        Mismatch | None: The mismatch fixed, or ``None`` if there was none.
+    """
+    with transaction.atomic():
+        list(
+            Wallet.objects.select_for_update()
+            .filter(user_id=candidate.user_id)
+            .values_list("pk", flat=True)
+        )
+        mismatch = _current(candidate.user_id)
+        if mismatch is None:
+            return None
+        Wallet.objects.filter(user_id=mismatch.user_id).update(
+            balance=mismatch.expected, updated_at=timezone.now()
+        )
+        balances_changed.send(
+            sender=Wallet,
+            deltas={mismatch.user_id: mismatch.expected - mismatch.balance},
+        )
+    return mismatch
+
+
+def reconcile(full: bool = False, fix: bool = False, report=None):
+    """
+    Checks that every wallet balance matches the sum of its activities.
+
+    Args:
+        full (bool): Check every user instead of those with activity since
+            the last finished run.
+        fix (bool): Set mismatched balances to the sum of the activities.
+            Mismatches are reported after they are fixed.
+        report (callable): Called with every :class:`Mismatch` found.
+
+    Returns:
+        ReconciliationRun: The recorded run.
+    """
+    since = None if full else last_reconciled_at()
+    run = ReconciliationRun.objects.create(
+        started_at=timezone.now(), full=since is None
+    )
+
+    def handle(candidates):
+        for candidate in candidates:
+            if fix:
+                mismatch = fix_mismatch(candidate)
+                run.fixed += mismatch is not None
+            else:
+                mismatch = confirm_mismatch(candidate)
+            if mismatch is None:
+                continue
+            run.mismatches += 1
+            if report is not None:
+                report(mismatch)
+
+    # The sums are streamed and matched against the wallets one chunk at a
+    # time, so memory stays flat however large the ledger grows.
+    totals = activity_totals(since)
+    for chunk in _chunks(totals, WALLET_RECONCILE_CHUNK_SIZE):
+        run.checked += len(chunk)
+        handle(compare_balances(dict(chunk)))
+    handle(wallets_without_activity(since))
+
+    run.finished_at = timezone.now()
+    run.save()
+    return run
@@ -1,9 +1,41 @@
+import csv
+import io
+import json
+from datetime import timedelta
 from decimal import Decimal
+from unittest import mock, skipUnless
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection, transaction
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from wallet.models import Activities, Wallet
+from wallet.models import (
+    Activities,
+    InsufficientFunds,
+    MonthlyActivity,
+    Transfer,
+    Wallet,
+    award_points,
+    bulk_post_activities,
+    history_page,
+    post_activity,
+    rebuild_monthly_activity,
+    transfer_points,
+)
+from wallet import leaderboard
+from wallet import reconcile as reconcile_module
+from wallet.awards import Award, AwardQueue, post_awards
+from wallet.benchmark import run_benchmark
+from wallet.leaderboard import (
+    CACHE_KEY,
+    RANK_GENERATION_KEY,
+    get_leaderboard,
+    user_rank,
+)
+from wallet.reconcile import Mismatch, reconcile
 
 User = get_user_model()
 
@@ -57,3 +89,535 @@ class TestWalletModel(TestCase):
         activity.delete()
         wallet.refresh_from_db()
         assert wallet.balance == 100.0
+
+
+class TestLedgerPosting(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser")
+        Wallet.objects.create(user=self.user, balance=100)
+
+    def balance(self):
+        return Wallet.objects.get(user=self.user).balance
+
+    def test_debit_is_applied(self):
+        """Test if a negative activity is taken from the balance"""
+        post_activity(self.user, "-30.50", "Resgate")
+        assert self.balance() == Decimal("69.50")
+
+    def test_failed_debit_saves_nothing(self):
+        """Test if an overdraft leaves neither an activity nor a balance change"""
+        with self.assertRaises(InsufficientFunds):
+            post_activity(self.user, -150, "Resgate")
+        assert not Activities.objects.exists()
+        assert self.balance() == 100
+
+    def test_edit_moves_balance_by_difference(self):
+        """Test if editing an activity applies only the change in value"""
+        activity = post_activity(self.user, 50, "Tarefa")
+        activity.value = 20
+        activity.save()
+        assert self.balance() == 120
+
+    def test_delete_cannot_overdraw(self):
+        """Test if reverting a spent credit is refused and nothing is deleted"""
+        activity = post_activity(self.user, 50, "Tarefa")
+        post_activity(self.user, -120, "Resgate")
+        with self.assertRaises(InsufficientFunds), transaction.atomic():
+            activity.delete()
+        assert Activities.objects.count() == 2
+        assert self.balance() == 30
+
+
+class TestBulkPosting(TestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"aluno{i}") for i in range(3)]
+        for user in self.users:
+            Wallet.objects.create(user=user, balance=10)
+
+    def balances(self):
+        return list(
+            Wallet.objects.order_by("user_id").values_list("balance", flat=True)
+        )
+
+    def test_award_points_in_four_queries(self):
+        """Test if a class is credited with one lock, INSERT, UPDATE and upsert"""
+        user_ids = [user.id for user in self.users]
+        with CaptureQueriesContext(connection) as context:
+            award_points(user_ids, 5, "Aula 1")
+        statements = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        assert len(statements) == 4
+        assert "ORDER BY" in statements[0]
+        assert self.balances() == [15, 15, 15]
+        assert Activities.objects.filter(description="Aula 1").count() == 3
+
+    def test_deltas_are_aggregated_per_user(self):
+        """Test if several entries for the same user add up"""
+        first, second, _ = self.users
+        bulk_post_activities(
+            [(first.id, 5, "Aula"), (first.id, -12, "Resgate"), (second.id, 1, "Aula")]
+        )
+        assert self.balances() == [3, 11, 10]
+        assert Activities.objects.count() == 3
+
+    def test_one_overdraft_rolls_back_everything(self):
+        """Test if the non-negative invariant holds for every user or none"""
+        first, second, _ = self.users
+        with self.assertRaises(InsufficientFunds):
+            bulk_post_activities([(first.id, 5, "Aula"), (second.id, -11, "Resgate")])
+        assert self.balances() == [10, 10, 10]
+        assert not Activities.objects.exists()
+
+
+class TestHistoryPage(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="aluno")
+        Wallet.objects.create(user=self.user, balance=0)
+        for index in range(5):
+            post_activity(self.user, 1, f"Aula {index}")
+
+    def walk(self, size):
+        descriptions, cursor = [], None
+        while True:
+            page = history_page(self.user, cursor, size=size)
+            descriptions += [activity.description for activity in page.activities]
+            if page.next_cursor is None:
+                return descriptions
+            cursor = page.next_cursor
+
+    def test_pages_walk_the_whole_history_newest_first(self):
+        """Test if the cursors visit every activity once, in order"""
+        expected = [f"Aula {index}" for index in reversed(range(5))]
+        assert self.walk(size=2) == expected
+        assert self.walk(size=5) == expected
+
+    def test_same_timestamp_is_ordered_by_id(self):
+        """Test if activities created at the same instant are not skipped"""
+        Activities.objects.update(created_at=timezone.now())
+        assert len(set(self.walk(size=2))) == 5
+
+    def test_invalid_cursor(self):
+        """Test if a tampered cursor is rejected"""
+        with self.assertRaises(ValueError):
+            history_page(self.user, "not-a-cursor")
+        self.client.force_login(self.user)
+        response = self.client.get("/wallet/wallet_profile/?after=not-a-cursor")
+        assert response.status_code == 400
+
+    def test_profile_page(self):
+        """Test if the page shows the balance and the first page"""
+        self.client.force_login(self.user)
+        response = self.client.get("/wallet/wallet_profile/")
+        assert response.status_code == 200
+        assert response.context["wallet"].balance == 5
+        assert len(response.context["user_data"]) == 5
+        assert response.context["next_cursor"] is None
+
+
+class TestReconcile(TestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"aluno{i}") for i in range(3)]
+        for user in self.users:
+            Wallet.objects.create(user=user, balance=0)
+            post_activity(user, 10, "Aula")
+
+    def test_matching_ledger(self):
+        """Test if a consistent ledger reports no mismatch"""
+        run = reconcile()
+        assert (run.checked, run.mismatches) == (3, 0)
+        assert run.finished_at is not None
+
+    def test_finds_and_fixes_drift(self):
+        """Test if a drifted balance is reported and fixed to the activity sum"""
+        drifted = self.users[1]
+        Wallet.objects.filter(user=drifted).update(balance=7)
+        found = []
+        run = reconcile(fix=True, report=found.append)
+        assert found == [Mismatch(drifted.id, Decimal(7), Decimal(10))]
+        assert (run.mismatches, run.fixed) == (1, 1)
+        assert Wallet.objects.get(user=drifted).balance == 10
+
+    def test_posting_during_the_run_is_not_overwritten(self):
+        """Test if a credit posted after the sums were read survives --fix"""
+        stale_totals = reconcile_module.activity_totals
+
+        def totals_then_post(since):
+            totals = list(stale_totals(since))
+            post_activity(self.users[0], 5, "Aula")
+            return iter(totals)
+
+        with mock.patch.object(
+            reconcile_module, "activity_totals", side_effect=totals_then_post
+        ):
+            run = reconcile(fix=True)
+        assert (run.mismatches, run.fixed) == (0, 0)
+        assert Wallet.objects.get(user=self.users[0]).balance == 15
+
+    def test_balance_without_activity(self):
+        """Test if a wallet with a balance but no activities is reported"""
+        user = User.objects.create_user(username="sem_atividade")
+        Wallet.objects.create(user=user, balance=3)
+        run = reconcile()
+        assert run.mismatches == 1
+
+    def test_incremental_run(self):
+        """Test if the next run only checks users with new activity"""
+        reconcile()
+        assert reconcile().checked == 0
+        post_activity(self.users[0], 1, "Aula")
+        assert reconcile().checked == 1
+        assert reconcile(full=True).checked == 3
+
+
+class TestExports(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="aluno")
+        Wallet.objects.create(user=self.user, balance=0)
+        post_activity(self.user, 10, "Aula, 1")
+        post_activity(self.user, 5, "Aula 2")
+        self.staff = User.objects.create_user(username="tutor", is_staff=True)
+
+    def download(self, response) -> str:
+        assert response.streaming
+        return b"".join(response.streaming_content).decode()
+
+    def test_user_csv(self):
+        """Test if a student downloads their own history as CSV"""
+        self.client.force_login(self.user)
+        response = self.client.get("/wallet/wallet_profile/export.csv")
+        assert response["Content-Type"] == "text/csv"
+        rows = list(csv.reader(io.StringIO(self.download(response))))
+        assert rows[0] == ["created_at", "value", "description"]
+        assert [row[2] for row in rows[1:]] == ["Aula 2", "Aula, 1"]
+
+    def test_csv_formulas_are_escaped(self):
+        """Test if text cells that a spreadsheet would run are prefixed"""
+        post_activity(self.user, -3, "=SUM(A1:A9)")
+        self.client.force_login(self.user)
+        response = self.client.get("/wallet/wallet_profile/export.csv")
+        rows = list(csv.reader(io.StringIO(self.download(response))))
+        assert rows[1][1:] == ["-3.00", "'=SUM(A1:A9)"]
+
+    def test_admin_json_with_date_range(self):
+        """Test if staff export every user's activities between two dates"""
+        Activities.objects.filter(description="Aula 2").update(
+            created_at=timezone.now() - timedelta(days=10)
+        )
+        self.client.force_login(self.staff)
+        today = timezone.localdate().isoformat()
+        response = self.client.get(
+            "/wallet/activities/export.json", {"start": today, "end": today}
+        )
+        rows = json.loads(self.download(response))
+        assert [row["description"] for row in rows] == ["Aula, 1"]
+        assert rows[0]["user__username"] == "aluno"
+
+    def test_admin_export_rejections(self):
+        """Test if the admin export checks the user, format and dates"""
+        self.client.force_login(self.user)
+        response = self.client.get("/wallet/activities/export.csv")
+        assert response.status_code == 302
+        self.client.force_login(self.staff)
+        response = self.client.get("/wallet/activities/export.xml")
+        assert response.status_code == 404
+        response = self.client.get("/wallet/activities/export.csv?start=ontem")
+        assert response.status_code == 400
+
+
+@mock.patch.object(leaderboard, "WALLET_LEADERBOARD_SIZE", 2)
+# Query counts below are of the wallet tables, not of a database cache.
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class TestLeaderboard(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.users = {}
+        for username, balance in [
+            ("ana", 30),
+            ("bruno", 20),
+            ("caio", 10),
+            ("duda", 5),
+        ]:
+            user = User.objects.create_user(username=username)
+            Wallet.objects.create(user=user, balance=balance)
+            self.users[username] = user
+
+    def post(self, username, value):
+        with self.captureOnCommitCallbacks(execute=True):
+            post_activity(self.users[username], value, "Aula")
+
+    def test_top_is_cached(self):
+        """Test if the top balances are read once, ranked, and ties shared"""
+        Wallet.objects.filter(user=self.users["bruno"]).update(balance=30)
+        with self.assertNumQueries(1):
+            board = get_leaderboard()
+        with self.assertNumQueries(0):
+            assert get_leaderboard() == board
+        assert [(entry.rank, entry.username) for entry in board] == [
+            (1, "ana"),
+            (1, "bruno"),
+        ]
+
+    def test_changes_outside_the_top_keep_the_cache(self):
+        """Test if a debit or a small credit below the top keeps the cache"""
+        get_leaderboard()
+        self.post("caio", -5)
+        self.post("duda", 1)
+        assert cache.get(CACHE_KEY) is not None
+
+    def test_changes_reaching_the_top_drop_the_cache(self):
+        """Test if a credit past the last entry reloads the leaderboard"""
+        get_leaderboard()
+        self.post("caio", 15)
+        assert cache.get(CACHE_KEY) is None
+        assert [entry.username for entry in get_leaderboard()] == ["ana", "caio"]
+
+    def test_user_rank(self):
+        """Test if ranks come from the cached top or from counting larger balances"""
+        assert user_rank(self.users["bruno"]) == 2
+        assert user_rank(self.users["duda"]) == 4
+        assert user_rank(User.objects.create_user(username="sem_carteira")) is None
+
+    @mock.patch("wallet.leaderboard.WALLET_LEADERBOARD_SIZE", 2)
+    def test_rank_outside_the_top_is_cached_until_a_change(self):
+        """Test if ranks below the top are counted once per balance change"""
+        assert user_rank(self.users["duda"]) == 4
+        with self.assertNumQueries(0):
+            assert user_rank(self.users["duda"]) == 4
+        self.post("duda", 6)
+        assert user_rank(self.users["duda"]) == 3
+
+    @mock.patch("wallet.leaderboard.WALLET_LEADERBOARD_SIZE", 1)
+    def test_evicted_generation_is_not_reused(self):
+        """Test if losing the generation counter never revives stale ranks"""
+        self.post("ana", 1)
+        assert user_rank(self.users["duda"]) == 4
+        stale = cache.get(RANK_GENERATION_KEY)
+        cache.delete(RANK_GENERATION_KEY)
+        self.post("caio", 1)
+        assert cache.get(RANK_GENERATION_KEY) not in (None, stale)
+        cache.delete(RANK_GENERATION_KEY)
+        user_rank(self.users["duda"])
+        assert cache.get(RANK_GENERATION_KEY) not in (None, stale)
+
+
+class TestMonthlyActivity(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="aluno")
+        Wallet.objects.create(user=self.user, balance=0)
+
+    def rollup(self):
+        return list(
+            MonthlyActivity.objects.order_by("month").values_list(
+                "count", "credits", "debits"
+            )
+        )
+
+    def test_postings_are_rolled_up(self):
+        """Test if posting, editing and deleting keep the month totals"""
+        post_activity(self.user, 10, "Aula")
+        spent = post_activity(self.user, -4, "Resgate")
+        (earned,) = bulk_post_activities([(self.user.id, 3, "Aula")])
+        assert self.rollup() == [(3, 13, 4)]
+
+        spent.value = -6
+        spent.save()
+        assert self.rollup() == [(3, 13, 6)]
+
+        with transaction.atomic():
+            earned.delete()
+        assert self.rollup() == [(2, 10, 6)]
+
+    def test_moving_an_activity_to_another_user(self):
+        """Test if changing the user moves the points and the month totals"""
+        other = User.objects.create_user(username="outro")
+        Wallet.objects.create(user=other, balance=0)
+        activity = post_activity(self.user, 50, "Aula")
+        activity.user = other
+        activity.value = 40
+        activity.save()
+        assert Wallet.objects.get(user=self.user).balance == 0
+        assert Wallet.objects.get(user=other).balance == 40
+        assert dict(MonthlyActivity.objects.values_list("user_id", "credits")) == {
+            self.user.id: 0,
+            other.id: 40,
+        }
+        assert reconcile(full=True).mismatches == 0
+
+    def test_rebuild_from_history(self):
+        """Test if the backfill splits the ledger per month"""
+        post_activity(self.user, 10, "Aula")
+        old = post_activity(self.user, -4, "Resgate")
+        Activities.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=62)
+        )
+        MonthlyActivity.objects.all().delete()
+        assert rebuild_monthly_activity() == 2
+        assert self.rollup() == [(1, 0, 4), (1, 10, 0)]
+
+
+class TestTransfer(TestCase):
+
+    def setUp(self):
+        self.ana = User.objects.create_user(username="ana")
+        self.bruno = User.objects.create_user(username="bruno")
+        Wallet.objects.create(user=self.ana, balance=10)
+        Wallet.objects.create(user=self.bruno, balance=0)
+
+    def balances(self):
+        return [
+            Wallet.objects.get(user=self.ana).balance,
+            Wallet.objects.get(user=self.bruno).balance,
+        ]
+
+    def test_transfer_posts_paired_activities(self):
+        """Test if a transfer debits the sender and credits the recipient"""
+        transfer = transfer_points(self.ana, self.bruno, 4, "key-1", "Obrigado")
+        assert self.balances() == [6, 4]
+        assert (transfer.debit.value, transfer.credit.value) == (-4, 4)
+        assert transfer.credit.description == "Transferência de ana: Obrigado"
+
+    def test_retry_does_not_pay_twice(self):
+        """Test if repeating the idempotency key returns the first transfer"""
+        first = transfer_points(self.ana, self.bruno, 4, "key-1")
+        assert transfer_points(self.ana, self.bruno, 4, "key-1") == first
+        assert self.balances() == [6, 4]
+        with self.assertRaises(ValueError):
+            transfer_points(self.ana, self.bruno, 5, "key-1")
+
+    def test_invalid_transfers(self):
+        """Test if overdrafts, self transfers and bad values change nothing"""
+        with self.assertRaises(InsufficientFunds):
+            transfer_points(self.ana, self.bruno, 11, "key-1")
+        with self.assertRaises(ValueError):
+            transfer_points(self.ana, self.ana, 1, "key-2")
+        with self.assertRaises(ValueError):
+            transfer_points(self.ana, self.bruno, 0, "key-3")
+        assert self.balances() == [10, 0]
+        assert not Transfer.objects.exists()
+        assert not Activities.objects.exists()
+
+    def test_double_submitted_form(self):
+        """Test if submitting the transfer form twice moves the points once"""
+        self.client.force_login(self.ana)
+        form = self.client.get("/wallet/transfer/").context["form"]
+        data = {
+            "recipient": "bruno",
+            "value": "3",
+            "idempotency_key": form.initial["idempotency_key"],
+        }
+        for _ in range(2):
+            response = self.client.post("/wallet/transfer/", data)
+            assert response.status_code == 302
+        assert self.balances() == [7, 3]
+
+        data["idempotency_key"] = "other"
+        data["value"] = "20"
+        response = self.client.post("/wallet/transfer/", data)
+        assert response.context["form"].errors == {"value": ["Saldo insuficiente."]}
+
+
+class TestBenchmark(TransactionTestCase):
+
+    def test_single_writer(self):
+        """Test if the benchmark runs, keeps the invariants and cleans up"""
+        result = run_benchmark(workers=1, operations=40, users=3, seed=1)
+        assert result.operations == 40
+        assert result.consistent, (result.mismatches, result.negative)
+        assert not User.objects.exists()
+
+    @skipUnless(connection.vendor == "postgresql", "Needs concurrent writers")
+    def test_concurrent_writers(self):
+        """Test if 20 writers on 3 wallets keep the balances consistent"""
+        result = run_benchmark(workers=20, operations=25, users=3, seed=1)
+        assert result.operations == 500
+        assert not result.errors, result.errors
+        assert result.consistent, (result.mismatches, result.negative)
+
+
+class TestAwardQueue(TestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create_user(username=f"aluno{i}") for i in range(3)]
+        for user in self.users:
+            Wallet.objects.create(user=user, balance=0)
+
+    def test_burst_is_posted_in_one_transaction(self):
+        """Test if hundreds of queued awards cost a single batch of queries"""
+        queue = AwardQueue(autostart=False)
+        queue.put(
+            [
+                Award(self.users[index % 3].id, Decimal(1), "PR", f"github:{index}")
+                for index in range(300)
+            ]
+        )
+        with CaptureQueriesContext(connection) as context:
+            assert queue.flush() == 300
+        statements = [
+            query["sql"]
+            for query in context.captured_queries
+            if "SAVEPOINT" not in query["sql"]
+        ]
+        assert len(statements) < 10
+        assert len(queue) == 0
+        assert list(
+            Wallet.objects.order_by("user_id").values_list("balance", flat=True)
+        ) == [100, 100, 100]
+
+    def test_duplicates_and_users_without_wallet_are_skipped(self):
+        """Test if a redelivered event pays once and unknown wallets are dropped"""
+        stranger = User.objects.create_user(username="sem_carteira")
+        award = Award(self.users[0].id, Decimal(5), "PR", "github:delivery-1:1")
+        assert post_awards([award, award]) == 1
+        assert post_awards([award, Award(stranger.id, 5, "PR", "github:x")]) == 0
+        assert Wallet.objects.get(user=self.users[0]).balance == 5
+
+
+class TestActivitiesAdmin(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="x")
+        self.users = [User.objects.create_user(username=f"aluno{i}") for i in range(3)]
+        for user in self.users:
+            Wallet.objects.create(user=user, balance=0)
+        self.client.force_login(self.admin)
+
+    def changelist(self, **params):
+        return self.client.get("/admin/wallet/activities/", params)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Test if users are joined instead of loaded one query per row"""
+        award_points([user.id for user in self.users], 5, "Aula")
+        with CaptureQueriesContext(connection) as few:
+            self.changelist()
+        award_points([user.id for user in self.users], 5, "Aula")
+        with CaptureQueriesContext(connection) as more:
+            self.changelist()
+        assert len(more.captured_queries) == len(few.captured_queries)
+
+    def test_totals_follow_the_filters(self):
+        """Test if the totals cover the searched user or the whole ledger"""
+        post_activity(self.users[0], 10, "Aula")
+        post_activity(self.users[0], -4, "Resgate")
+        post_activity(self.users[1], 7, "Aula")
+        response = self.changelist(q="aluno0")
+        assert len(response.context["cl"].result_list) == 2
+        assert response.context["totals"] == {"count": 2, "credits": 10, "debits": 4}
+        response = self.changelist()
+        assert response.context["totals"] == {"count": 3, "credits": 17, "debits": 4}
+
+    def test_user_autocomplete(self):
+        """Test if the change form looks users up instead of listing them"""
+        response = self.client.get("/admin/wallet/activities/add/")
+        assert "admin-autocomplete" in response.content.decode()
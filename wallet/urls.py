@@ -7,4 +7,16 @@ app_name = WalletConfig.name
 
 urlpatterns = [
     path("wallet_profile/", views.history_profile, name="wallet_profile"),
+    path("leaderboard/", views.leaderboard, name="leaderboard"),
+    path("transfer/", views.transfer, name="transfer"),
+    path(
+        "wallet_profile/export.<str:export_format>",
+        views.export_history,
+        name="export_history",
+    ),
+    path(
+        "activities/export.<str:export_format>",
+        views.export_activities,
+        name="export_activities",
+    ),
 ]
@@ -1,10 +1,125 @@
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
+from django.core.exceptions import BadRequest
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from wallet.exports import EXPORT_FORMATS, export_response
+from wallet.leaderboard import get_leaderboard, user_rank
+from wallet.forms import TransferForm
+from wallet.models import (
+    Activities,
+    InsufficientFunds,
+    Wallet,
+    history_page,
+    monthly_summary,
+    transfer_points,
+)
 
-from wallet.models import Activities
+USER_EXPORT_COLUMNS = ["created_at", "value", "description"]
+ADMIN_EXPORT_COLUMNS = ["id", "created_at", "user__username", "value", "description"]
 
 
 @login_required
 def history_profile(request):
-    user_data = Activities.objects.filter(user=request.user).order_by("-created_at")
-    return render(request, "wallet/wallet_profile.html", {"user_data": user_data})
+    try:
+        page = history_page(request.user, request.GET.get("after"))
+    except ValueError as error:
+        raise BadRequest(str(error))
+    wallet = Wallet.objects.filter(user=request.user).only("balance").first()
+    return render(
+        request,
+        "wallet/wallet_profile.html",
+        {
+            "wallet": wallet,
+            "months": monthly_summary(request.user),
+            "user_data": page.activities,
+            "next_cursor": page.next_cursor,
+            "is_first_page": not request.GET.get("after"),
+        },
+    )
+
+
+@login_required
+def transfer(request):
+    if request.method == "POST":
+        form = TransferForm(request.POST)
+        if form.is_valid():
+            try:
+                transfer_points(
+                    request.user,
+                    form.cleaned_data["recipient"],
+                    form.cleaned_data["value"],
+                    form.cleaned_data["idempotency_key"],
+                    form.cleaned_data["description"],
+                )
+            except InsufficientFunds:
+                form.add_error("value", "Saldo insuficiente.")
+            except Wallet.DoesNotExist:
+                form.add_error("recipient", "Este usuário não possui carteira.")
+            except ValueError as error:
+                form.add_error(None, str(error))
+            else:
+                return redirect("wallet:wallet_profile")
+    else:
+        form = TransferForm(initial={"idempotency_key": uuid.uuid4().hex})
+    return render(request, "wallet/transfer.html", {"form": form})
+
+
+@login_required
+def leaderboard(request):
+    return render(
+        request,
+        "wallet/leaderboard.html",
+        {"entries": get_leaderboard(), "rank": user_rank(request.user)},
+    )
+
+
+def _check_format(export_format: str):
+    if export_format not in EXPORT_FORMATS:
+        raise Http404(f"Unknown export format: {export_format}")
+
+
+def _day_start(value: str, name: str) -> datetime:
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise BadRequest(f"Invalid {name} date, expected YYYY-MM-DD: {value!r}")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+@login_required
+def export_history(request, export_format: str):
+    """
+    Downloads the whole activity history of the logged user.
+    """
+    _check_format(export_format)
+    queryset = Activities.objects.filter(user=request.user).order_by(
+        "-created_at", "-id"
+    )
+    return export_response(queryset, USER_EXPORT_COLUMNS, export_format, "codapoints")
+
+
+@staff_member_required
+def export_activities(request, export_format: str):
+    """
+    Downloads the activities of every user, optionally between the ``start``
+    and ``end`` dates (both inclusive) given in the query string.
+    """
+    _check_format(export_format)
+    queryset = Activities.objects.order_by("created_at", "id")
+    if start := request.GET.get("start"):
+        queryset = queryset.filter(created_at__gte=_day_start(start, "start"))
+    if end := request.GET.get("end"):
+        end_of_day = _day_start(end, "end") + timedelta(days=1)
+        queryset = queryset.filter(created_at__lt=end_of_day)
+    return export_response(
+        queryset, ADMIN_EXPORT_COLUMNS, export_format, "codapoints-activities"
+    )